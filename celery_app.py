@@ -12,23 +12,36 @@ app.conf.update(
     broker_connection_retry_on_startup=True,
 )
 
-app.autodiscover_tasks(['distribution'])
+app.autodiscover_tasks(['distribution', 'users'])
 
 app.conf.beat_schedule = {
-    'daily_tasks': {
-        'task': 'distribution.tasks.daily_tasks',
+    'dispatch_due_mailings': {
+        'task': 'distribution.tasks.dispatch_due_mailings',
         'schedule': crontab(minute='*/1'),
         'options': {'queue': 'mailing_queue'}
     },
-    'weekly_tasks': {
-        'task': 'distribution.tasks.weekly_tasks',
-        'schedule': crontab(day_of_week='6'),
+    'send_outbox': {
+        'task': 'distribution.tasks.send_outbox',
+        'schedule': crontab(minute='*/1'),
         'options': {'queue': 'mailing_queue'}
     },
-    'monthly_tasks': {
-        'task': 'distribution.tasks.monthly_tasks',
-        'schedule': crontab(day_of_month='6'),
+    'send_outbox_retries': {
+        'task': 'distribution.tasks.send_outbox_retries',
+        'schedule': crontab(minute='*/1'),
+    },
+    'sweep_expired_mailings': {
+        'task': 'distribution.tasks.sweep_expired_mailings',
+        'schedule': crontab(minute='*/1'),
+        'options': {'queue': 'mailing_queue'}
+    },
+    'archive_old_logs': {
+        'task': 'distribution.tasks.archive_old_logs',
+        'schedule': crontab(hour=3, minute=0),
         'options': {'queue': 'mailing_queue'}
     },
 }
 app.conf.task_default_queue = 'mailing_queue'
+app.conf.task_routes = {
+    'distribution.tasks.send_outbox_retries': {'queue': 'retry_queue'},
+    'users.tasks.*': {'queue': 'priority_queue'},
+}
@@ -152,6 +152,61 @@ EMAIL_USE_SSL = False
 EMAIL_HOST_USER = os.getenv('EMAIL')
 EMAIL_HOST_PASSWORD = os.getenv('MAIL_PASSWORD')
 
+# Recipients of a mailing run are written to the outbox in chunks and sent in batches of MAILING_CHUNK_SIZE.
+# With MAILING_FANOUT the outbox is drained by MAILING_OUTBOX_DRAINERS parallel celery tasks
+MAILING_FANOUT = os.getenv('MAILING_FANOUT', 'False') == 'True'
+MAILING_CHUNK_SIZE = int(os.getenv('MAILING_CHUNK_SIZE', 500))
+MAILING_OUTBOX_DRAINERS = int(os.getenv('MAILING_OUTBOX_DRAINERS', 4))
+
+# Mailing is processed under a Redis lease with this TTL in seconds, renewed by a heartbeat while the worker is alive
+MAILING_LEASE_TTL = int(os.getenv('MAILING_LEASE_TTL', 60))
+
+# Serial mailing run without a checkpoint for this time is considered interrupted and is resumed
+MAILING_RUN_STALE_SECONDS = int(os.getenv('MAILING_RUN_STALE_SECONDS', 60 * 10))
+
+# Asyncio delivery engine: MAILING_ASYNC_CONCURRENCY SMTP sessions per worker process
+MAILING_ASYNC_ENGINE = os.getenv('MAILING_ASYNC_ENGINE', 'False') == 'True'
+MAILING_ASYNC_CONCURRENCY = int(os.getenv('MAILING_ASYNC_CONCURRENCY', 10))
+# Unsent messages of a batch running longer than this number of seconds are failed as transient and retried
+MAILING_ASYNC_BATCH_TIMEOUT = int(os.getenv('MAILING_ASYNC_BATCH_TIMEOUT', 60 * 10))
+
+# Cluster-wide SMTP rate limits shared by all celery workers through Redis.
+# Relay limits are looked up by EMAIL_HOST, sender limits by from email, 'default' is used for others.
+# rate - messages per second, burst - bucket size, connections - concurrent connections to the relay.
+MAILING_REDIS_URL = os.getenv('MAILING_REDIS_URL', 'redis://localhost:6379/2')
+MAILING_RATE_LIMIT_ENABLED = os.getenv('MAILING_RATE_LIMIT_ENABLED', 'False') == 'True'
+MAILING_RATE_LIMIT_TIMEOUT = int(os.getenv('MAILING_RATE_LIMIT_TIMEOUT', 300))
+MAILING_RELAY_LIMITS = {
+    'default': {'rate': 10, 'burst': 10, 'connections': 5, 'slot_ttl': 60},
+}
+MAILING_SENDER_LIMITS = {
+    'default': {'rate': 10, 'burst': 10},
+}
+
+# Transient SMTP failures are retried from the outbox by the retry queue with exponential backoff,
+# permanent failures and exhausted retries are saved to FailedDelivery
+MAILING_RETRY_MAX_ATTEMPTS = int(os.getenv('MAILING_RETRY_MAX_ATTEMPTS', 5))
+MAILING_RETRY_BASE_DELAY = int(os.getenv('MAILING_RETRY_BASE_DELAY', 60))
+MAILING_RETRY_MAX_DELAY = int(os.getenv('MAILING_RETRY_MAX_DELAY', 60 * 60))
+
+# Rendered MIME templates of messages are cached in Redis and in every worker process
+MIME_CACHE_TIMEOUT = 60 * 60 * 24
+MIME_LOCAL_CACHE_SIZE = 256
+
+# Delivery logs are written by bulk_create every LOG_BUFFER_SIZE records or LOG_BUFFER_SECONDS seconds
+LOG_BUFFER_SIZE = int(os.getenv('LOG_BUFFER_SIZE', 200))
+LOG_BUFFER_SECONDS = float(os.getenv('LOG_BUFFER_SECONDS', 5))
+
+# Log records older than LOG_RETENTION_DAYS are archived to gzip files in LOG_ARCHIVE_DIR (jsonl or csv)
+# and deleted in batches of LOG_RETENTION_BATCH_SIZE, daily statistics are kept
+LOG_RETENTION_DAYS = int(os.getenv('LOG_RETENTION_DAYS', 90))
+LOG_ARCHIVE_DIR = os.getenv('LOG_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive'))
+LOG_ARCHIVE_FORMAT = os.getenv('LOG_ARCHIVE_FORMAT', 'jsonl')
+LOG_RETENTION_BATCH_SIZE = int(os.getenv('LOG_RETENTION_BATCH_SIZE', 5000))
+
+# Outbox emails of runs finished more than OUTBOX_RETENTION_DAYS ago are deleted by the retention task
+OUTBOX_RETENTION_DAYS = int(os.getenv('OUTBOX_RETENTION_DAYS', 7))
+
 # APSCHEDULER_DATETIME_FORMAT = "N j, Y, f:s a"
 # APSCHEDULER_RUN_NOW_TIMEOUT = 25
 
@@ -216,3 +271,9 @@ CACHES = {
         'LOCATION': 'redis://127.0.0.1:6379/1',
     }
 }
+
+# Dashboard statistics are cached per user scope and invalidated by a version counter on every write
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_CACHE_TIMEOUT', 60 * 60))
+
+# Blocked user ids are kept in a Redis set, every process refreshes its copy once per this number of seconds
+BLOCKED_USERS_CACHE_TTL = int(os.getenv('BLOCKED_USERS_CACHE_TTL', 5))
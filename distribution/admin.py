@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from distribution.models import Client, MailingSettings, Message, Log
+from distribution.models import Client, MailingSettings, Message, Log, FailedDelivery, MailingRun, OutboxEmail, \
+    DeliveryState, DailyDeliveryStat
 
 
 @admin.register(Client)
@@ -28,3 +29,36 @@ class LogAdmin(admin.ModelAdmin):
     list_display = ['pk', 'mailing_list', 'time', 'status', 'server_response', ]
     list_filter = ['mailing_list', 'status', ]
     search_fields = ['mailing_list', 'time', 'status', ]
+
+
+@admin.register(DailyDeliveryStat)
+class DailyDeliveryStatAdmin(admin.ModelAdmin):
+    list_display = ['pk', 'mailing_list', 'owner', 'day', 'sent', 'failed', ]
+    list_filter = ['day', 'mailing_list', ]
+
+
+@admin.register(MailingRun)
+class MailingRunAdmin(admin.ModelAdmin):
+    list_display = ['pk', 'mailing_list', 'status', 'sent', 'failed', 'cursor', 'started_at', 'checkpoint_at', ]
+    list_filter = ['mailing_list', 'status', ]
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['pk', 'mailing_list', 'run', 'recipient', 'state', 'attempts', 'next_attempt_at', ]
+    list_filter = ['state', 'mailing_list', ]
+    search_fields = ['recipient', ]
+
+
+@admin.register(DeliveryState)
+class DeliveryStateAdmin(admin.ModelAdmin):
+    list_display = ['pk', 'mailing_list', 'recipient', 'period', 'state', 'attempts', 'updated_at', ]
+    list_filter = ['state', 'mailing_list', ]
+    search_fields = ['recipient', ]
+
+
+@admin.register(FailedDelivery)
+class FailedDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['pk', 'mailing_list', 'recipient', 'attempts', 'smtp_code', 'created_at', ]
+    list_filter = ['mailing_list', 'smtp_code', ]
+    search_fields = ['recipient', 'server_response', ]
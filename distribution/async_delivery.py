@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from smtplib import SMTPException
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+from distribution.throttling import release_connection_slot
+
+logger = logging.getLogger(__name__)
+
+_connection_pool = []
+
+
+class DeliveryUnknown(Exception):
+    """
+    Send was still running in an executor thread when the batch timed out, the message may have
+    been delivered. It is a permanent failure, so the message is not sent again by the retry queue.
+    """
+
+
+def get_connection_pool(size):
+    """
+    Returns SMTP connections kept open by the current worker process for the async engine.
+    Pool grows lazily up to size connections and is reused between batches.
+    :param size: number of concurrent SMTP sessions
+    :returns: list of email backend instances
+    """
+    while len(_connection_pool) < size:
+        _connection_pool.append(get_connection(fail_silently=False))
+    return _connection_pool[:size]
+
+
+def discard_connection_pool():
+    """
+    Drops connections of the pool without QUIT after a timed out batch: a send may still be running
+    in an executor thread over them. Sockets are closed when the thread finishes.
+    """
+    while _connection_pool:
+        release_connection_slot(_connection_pool.pop())
+
+
+def close_connection_pool():
+    """
+    Closes all SMTP connections of the async engine pool.
+    """
+    while _connection_pool:
+        connection = _connection_pool.pop()
+        connection.close()
+        release_connection_slot(connection)
+
+
+async def _session_worker(connection, queue, results, in_flight, executor, deliver):
+    """
+    Takes messages from the queue one by one and sends them over its own SMTP session.
+    smtplib is blocking, so every send runs in the executor thread bound to this session.
+    Any exception is recorded as a failure of the message, so the worker keeps consuming the queue
+    and the producer never waits on a queue without consumers. Recipient of a running send is kept
+    in in_flight, a cancelled worker leaves it there.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        message = await queue.get()
+        if message is None:
+            queue.task_done()
+            return
+        recipient = message.to[0]
+        in_flight.add(recipient)
+        try:
+            await loop.run_in_executor(executor, deliver, connection, message)
+            results.append((recipient, None))
+        except (SMTPException, OSError) as error:
+            results.append((recipient, error))
+        except Exception as error:
+            logger.exception(f"Unexpected error while sending message to {recipient}")
+            results.append((recipient, error))
+        finally:
+            queue.task_done()
+        in_flight.discard(recipient)
+
+
+async def _feed(queue, messages, workers):
+    for message in messages:
+        await queue.put(message)
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+
+
+async def deliver_batch(messages, connections, deliver, timeout=None):
+    """
+    Pushes messages through all connections concurrently.
+    If the batch is not sent within timeout seconds, workers are cancelled. Messages which were not
+    started are reported with TimeoutError, a transient failure which is retried from the outbox.
+    Messages being sent at that moment can not be cancelled and may still be delivered, they are reported
+    with DeliveryUnknown and are not retried.
+    :param messages: iterable of EmailMessage instances with one recipient each
+    :param connections: list of email backend instances, one per concurrent session
+    :param deliver: function(connection, message) sending one message
+    :param timeout: seconds for the whole batch, None for no limit
+    :returns: list of tuples (recipient, error), error is None for delivered message
+    """
+    messages = list(messages)
+    queue = asyncio.Queue(maxsize=len(connections) * 2)
+    results = []
+    in_flight = set()
+    executor = ThreadPoolExecutor(max_workers=len(connections))
+    workers = [
+        asyncio.create_task(_session_worker(connection, queue, results, in_flight, executor, deliver))
+        for connection in connections
+    ]
+    try:
+        await asyncio.wait_for(_feed(queue, messages, workers), timeout)
+    except asyncio.TimeoutError:
+        for worker in workers:
+            worker.cancel()
+        reported = {recipient for recipient, error in results}
+        unknown = DeliveryUnknown(f"Batch was not sent in {timeout} seconds, message was being sent")
+        not_started = TimeoutError(f"Batch was not sent in {timeout} seconds")
+        results.extend(
+            (message.to[0], unknown if message.to[0] in in_flight else not_started)
+            for message in messages if message.to[0] not in reported
+        )
+        logger.error(f"Async delivery batch timed out after {timeout} seconds")
+    finally:
+        # blocked smtplib calls can not be interrupted, do not wait for their threads
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def run_batch(messages, concurrency, deliver):
+    """
+    Sync entry point of the async engine for celery workers. Batch is limited by
+    settings.MAILING_ASYNC_BATCH_TIMEOUT, connections of a timed out batch are discarded.
+    :returns: list of tuples (recipient, error), error is None for delivered message
+    """
+    connections = get_connection_pool(concurrency)
+    timeout = settings.MAILING_ASYNC_BATCH_TIMEOUT
+    started = time.monotonic()
+    results = asyncio.run(deliver_batch(messages, connections, deliver, timeout))
+    if time.monotonic() - started >= timeout:
+        discard_connection_pool()
+    return results
@@ -0,0 +1,83 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Lower, Trim
+
+from distribution.models import MailingSettings, DailyDeliveryStat
+
+ALL_SCOPE = 'all'
+
+
+def get_version_key(scope):
+    return f'dashboard:version:{scope}'
+
+
+def get_dashboard_version(scope):
+    """
+    Returns current version of the dashboards of the scope. A missing version starts from the current time,
+    so dashboards cached before the version key was evicted are never served again.
+    :param scope: owner id or ALL_SCOPE
+    :returns: int
+    """
+    key = get_version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_dashboard_version(*owner_ids):
+    """
+    Invalidates cached dashboards of the owners and of users who see all mailings.
+    Called by signals and bulk writes of mailings, clients and delivery logs.
+    :param owner_ids: ids of owners whose data was changed
+    """
+    for scope in (*set(owner_ids), ALL_SCOPE):
+        key = get_version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def compute_dashboard(owner=None):
+    """
+    Computes mailing counters with one aggregate query and delivery counters with one query to the rollup.
+    Distinct recipients are counted by the database over normalized (trimmed, lower case) emails,
+    no Client rows are loaded.
+    :param owner: user instance, statistics of all users if None
+    :returns: dict with all, active, clients_count, sent and error counters
+    """
+    mailings = MailingSettings.objects.all()
+    stats = DailyDeliveryStat.objects.all()
+    if owner is not None:
+        mailings = mailings.filter(owner=owner)
+        stats = stats.filter(owner=owner)
+    dashboard = mailings.aggregate(
+        # join with clients repeats mailing rows, so mailings are counted distinct
+        all=Count('pk', distinct=True),
+        active=Count('pk', filter=Q(status=MailingSettings.STARTED), distinct=True),
+        clients_count=Count(Lower(Trim('clients__email')), distinct=True),
+    )
+    dashboard.update(stats.aggregate(sent=Sum('sent', default=0), error=Sum('failed', default=0)))
+    return dashboard
+
+
+def get_dashboard(user):
+    """
+    Returns dashboard statistics of the user from the cache. Key contains permission scope and its version,
+    so a manager's totals are never shown to an ordinary user and any write to mailings, clients or logs
+    of the scope makes the next request compute fresh statistics. A cache hit costs no database queries.
+    :param user: current user
+    :returns: dict with all, active, clients_count, sent and error counters
+    """
+    scope = ALL_SCOPE if user.has_perm('distribution.can_see_all_mailing_settings') else user.pk
+    key = f'dashboard:{scope}:{get_dashboard_version(scope)}'
+    dashboard = cache.get(key)
+    if dashboard is None:
+        dashboard = compute_dashboard(None if scope == ALL_SCOPE else user)
+        cache.set(key, dashboard, settings.DASHBOARD_CACHE_TIMEOUT)
+    return dashboard
@@ -0,0 +1,99 @@
+import csv
+import json
+from datetime import datetime, time
+
+from django.utils import timezone
+
+from distribution.models import Log, Client
+
+EXPORTS = {
+    'logs': {
+        'model': Log,
+        'fields': ['id', 'time', 'status', 'server_response', 'recipient', 'mailing_list_id', 'owner_id'],
+        'permission': 'distribution.can_see_all_logs',
+    },
+    'clients': {
+        'model': Client,
+        'fields': ['id', 'FIO', 'email', 'comment', 'owner_id'],
+        'permission': 'distribution.can_see_all_clients',
+    },
+}
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """
+    File-like object for csv.writer which returns the written line instead of buffering it.
+    """
+
+    def write(self, value):
+        return value
+
+
+def serialize_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_lines(rows, fields, fmt, header=True):
+    """
+    Serializes rows one by one, so the whole export is never kept in memory.
+    :param rows: iterable of dicts with fields keys
+    :param fields: list of field names
+    :param fmt: 'csv' or 'jsonl'
+    :param header: add CSV header line
+    :returns: generator of text lines
+    """
+    if fmt == 'csv':
+        writer = csv.writer(Echo())
+        if header:
+            yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([serialize_value(row[field]) for field in fields])
+    elif fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps({field: serialize_value(row[field]) for field in fields}, ensure_ascii=False) + '\n'
+    else:
+        raise ValueError(f"Unknown export format {fmt}")
+
+
+def get_export_queryset(name, user=None, owner=None, mailing_id=None, date_from=None, date_to=None):
+    """
+    Filters rows of the export. User without permission to see all rows gets only own rows.
+    :param name: 'logs' or 'clients'
+    :param user: user requesting the export, None for management commands
+    :param owner: user whose rows are exported
+    :param mailing_id: logs of the mailing or clients of the mailing
+    :param date_from: first date of logs, inclusive
+    :param date_to: last date of logs, inclusive
+    :returns: queryset of dicts ordered by id
+    """
+    export = EXPORTS[name]
+    queryset = export['model'].objects.all()
+    if user is not None and not user.has_perm(export['permission']):
+        owner = user
+    if owner is not None:
+        queryset = queryset.filter(owner=owner)
+    if mailing_id is not None:
+        if name == 'logs':
+            queryset = queryset.filter(mailing_list_id=mailing_id)
+        else:
+            queryset = queryset.filter(all_clients=mailing_id)
+    if name == 'logs':
+        if date_from is not None:
+            queryset = queryset.filter(time__gte=timezone.make_aware(datetime.combine(date_from, time.min)))
+        if date_to is not None:
+            queryset = queryset.filter(time__lte=timezone.make_aware(datetime.combine(date_to, time.max)))
+    return queryset.order_by('pk').values(*export['fields'])
+
+
+def iter_export(queryset, name, fmt, chunk_size=2000):
+    """
+    Streams export rows through a server-side cursor, memory use does not depend on the number of rows.
+    :returns: generator of text lines
+    """
+    return iter_lines(queryset.iterator(chunk_size=chunk_size), EXPORTS[name]['fields'], fmt)
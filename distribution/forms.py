@@ -1,3 +1,4 @@
+from django import forms
 from django.forms import ModelForm
 
 from distribution.models import Message, MailingSettings, Client
@@ -65,3 +66,23 @@ class ClientForm(StyleFormMixin, ModelForm):
     class Meta:
         model = Client
         fields = ('FIO', 'email', 'comment',)
+
+
+class ClientImportForm(StyleFormMixin, forms.Form):
+    """
+    Form for bulk import of clients from a CSV or JSONL file.
+
+    Methods:
+        __init__(self, args, *kwargs): Initializes the form and filters the
+            'mailing' queryset based on the current user.
+    """
+    file = forms.FileField(label='Файл с клиентами')
+    format = forms.ChoiceField(label='Формат файла', choices=[('csv', 'CSV'), ('jsonl', 'JSONL')])
+    mailing = forms.ModelChoiceField(label='Добавить в рассылку', queryset=MailingSettings.objects.none(),
+                                     required=False)
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        if user:
+            self.fields['mailing'].queryset = MailingSettings.objects.filter(owner=user)
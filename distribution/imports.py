@@ -0,0 +1,138 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower, Trim
+
+from distribution.dashboard import bump_dashboard_version
+from distribution.models import Client, MailingSettings
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+EMAIL_MAX_LENGTH = Client._meta.get_field('email').max_length
+FIO_MAX_LENGTH = Client._meta.get_field('FIO').max_length
+
+
+def iter_import_rows(file, fmt):
+    """
+    Reads client rows from a text stream one by one. CSV must have a header with email column,
+    FIO and comment columns are optional. JSONL has one object with the same keys per line.
+    :param file: text file object
+    :param fmt: 'csv' or 'jsonl'
+    :returns: generator of dicts
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(file)
+    elif fmt == 'jsonl':
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unknown import format {fmt}")
+
+
+class ClientImportError(Exception):
+    """
+    Import was stopped by an unreadable row or a database error. Chunks written before the failure
+    stay saved, result describes them.
+    """
+
+    def __init__(self, result, error):
+        super().__init__(f"{error}")
+        self.result = result
+        self.error = error
+
+
+def normalize_email(email):
+    """
+    :returns: trimmed lower case email, the same normalization as used for mailing recipients
+    """
+    return (email or '').strip().lower()
+
+
+def clean_row(row):
+    """
+    Validates one imported row.
+    :param row: parsed row, a dict for a valid file
+    :returns: tuple (email, FIO, comment) or None for an invalid row
+    """
+    if not isinstance(row, dict) or not isinstance(row.get('email') or '', str):
+        return None
+    email = normalize_email(row.get('email'))
+    if len(email) > EMAIL_MAX_LENGTH:
+        return None
+    try:
+        validate_email(email)
+    except ValidationError:
+        return None
+    return email, str(row.get('FIO') or '')[:FIO_MAX_LENGTH], str(row.get('comment') or '') or None
+
+
+def import_clients(rows, owner, mailing=None, chunk_size=None):
+    """
+    Creates clients of the owner from rows in chunks with one bulk_create per chunk.
+    Emails are validated against the Client.email field and normalized, emails already present among
+    the owner's clients or earlier in the file are skipped by a dict lookup. If mailing is given,
+    all imported emails, new and existing, are attached to it with one bulk insert into the M2M
+    through table per chunk. Every chunk is written in its own transaction.
+    :param rows: iterable of dicts with email, FIO and comment keys
+    :param owner: user instance
+    :param mailing: mailing settings instance of the owner or None
+    :param chunk_size: rows per chunk, settings.MAILING_CHUNK_SIZE by default
+    :returns: dict with rows, created, duplicates, invalid, attached counters and elapsed seconds
+    :raises: ClientImportError with counters of the saved chunks if reading or writing a chunk failed
+    """
+    chunk_size = chunk_size or settings.MAILING_CHUNK_SIZE
+    started = time.monotonic()
+    result = {'rows': 0, 'created': 0, 'duplicates': 0, 'invalid': 0, 'attached': 0}
+    known = dict(Client.objects.filter(owner=owner).annotate(
+        normalized_email=Lower(Trim('email'))
+    ).values_list('normalized_email', 'pk').iterator(chunk_size=chunk_size))
+    Through = MailingSettings.clients.through
+
+    rows = iter(rows)
+    try:
+        while chunk := list(islice(rows, chunk_size)):
+            counters = {'rows': len(chunk), 'duplicates': 0, 'invalid': 0, 'attached': 0}
+            new_clients = []
+            attach_ids = set()
+            for row in chunk:
+                cleaned = clean_row(row)
+                if cleaned is None:
+                    counters['invalid'] += 1
+                    continue
+                email, fio, comment = cleaned
+                if email in known:
+                    counters['duplicates'] += 1
+                    if known[email] is not None:
+                        attach_ids.add(known[email])
+                    continue
+                # pk of a new client is known after bulk_create
+                known[email] = None
+                new_clients.append(Client(email=email, FIO=fio, comment=comment, owner=owner))
+            with transaction.atomic():
+                Client.objects.bulk_create(new_clients)
+                for client in new_clients:
+                    known[client.email] = client.pk
+                    attach_ids.add(client.pk)
+                if mailing is not None and attach_ids:
+                    Through.objects.bulk_create(
+                        [Through(mailingsettings_id=mailing.pk, client_id=client_id) for client_id in attach_ids],
+                        ignore_conflicts=True
+                    )
+                    counters['attached'] = len(attach_ids)
+            counters['created'] = len(new_clients)
+            for key, value in counters.items():
+                result[key] += value
+    except Exception as e:
+        result['seconds'] = time.monotonic() - started
+        raise ClientImportError(result, e) from e
+    finally:
+        # bulk inserts send no post_save and m2m_changed signals
+        bump_dashboard_version(owner.pk)
+    result['seconds'] = time.monotonic() - started
+    return result
@@ -0,0 +1,91 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+
+from django.conf import settings
+
+from distribution.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Renews or deletes the lease only if it is still held by the given token
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class Lease:
+    """
+    Redis lease that lets only one worker of the cluster process a resource.
+    Lease expires after ttl seconds unless the holder renews it, a heartbeat thread renews it
+    every ttl / 3 seconds while the holder is alive. So the lease of a crashed worker is free after ttl.
+
+    Usage:
+        with Lease('mailing:1') as lease:
+            if lease.acquired:
+                ...
+    """
+
+    def __init__(self, name, ttl=None):
+        self.key = f'lease:{name}'
+        self.ttl = ttl or settings.MAILING_LEASE_TTL
+        self.token = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.acquired = False
+        self.redis = get_redis()
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def acquire(self):
+        """
+        :returns: True if lease was acquired, otherwise logs the current holder
+        """
+        self.acquired = bool(self.redis.set(self.key, self.token, nx=True, px=int(self.ttl * 1000)))
+        if self.acquired:
+            self._heartbeat = threading.Thread(target=self._renew_forever, daemon=True)
+            self._heartbeat.start()
+        else:
+            holder = self.redis.get(self.key)
+            logger.info(f"Lease {self.key} is held by {holder.decode() if holder else 'nobody'}, "
+                        f"{self.token} skipped")
+        return self.acquired
+
+    def renew(self):
+        """
+        :returns: True if lease is still held and was prolonged
+        """
+        return bool(self.redis.eval(RENEW_SCRIPT, 1, self.key, self.token, int(self.ttl * 1000)))
+
+    def _renew_forever(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                if not self.renew():
+                    logger.warning(f"Lease {self.key} was lost by {self.token}")
+                    return
+            except Exception as e:
+                logger.error(f"While renewing lease {self.key} error occurred: {e}")
+
+    def release(self):
+        if not self.acquired:
+            return
+        self._stop.set()
+        self._heartbeat.join()
+        self.redis.eval(RELEASE_SCRIPT, 1, self.key, self.token)
+        self.acquired = False
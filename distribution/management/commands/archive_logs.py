@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from distribution.retention import archive_logs
+
+
+class Command(BaseCommand):
+    """
+    Archives Log records older than the retention age to a compressed file and deletes them.
+    """
+    help = "Archive and delete old delivery logs, daily statistics are kept."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.LOG_RETENTION_DAYS)
+        parser.add_argument('--batch-size', type=int, default=settings.LOG_RETENTION_BATCH_SIZE)
+        parser.add_argument('--format', choices=['jsonl', 'csv'], default=settings.LOG_ARCHIVE_FORMAT)
+        parser.add_argument('--archive-dir', default=settings.LOG_ARCHIVE_DIR)
+
+    def handle(self, *args, **options):
+        result = archive_logs(options['days'], options['batch_size'], options['format'], options['archive_dir'])
+        if not result['archived']:
+            self.stdout.write(f"No log records older than {options['days']} days")
+            return
+        seconds = max(result['seconds'], 1e-6)
+        self.stdout.write(f"{result['archived']} records archived to {result['path']} "
+                          f"({result['bytes'] / 1024:.1f} KiB) in {seconds:.2f}s, "
+                          f"{result['archived'] / seconds:.0f} records/s")
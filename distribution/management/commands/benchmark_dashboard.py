@@ -0,0 +1,77 @@
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from distribution.dashboard import compute_dashboard
+from distribution.models import Client, MailingSettings, Message
+from users.models import User
+
+
+def count_clients_in_python(owner):
+    """
+    Previous implementation of clients_count: prefetches clients of every mailing into a set of emails.
+    """
+    clients = set()
+    for mailing in MailingSettings.objects.filter(owner=owner).prefetch_related('clients'):
+        clients.update(client.email.strip().lower() for client in mailing.clients.all())
+    return len(clients)
+
+
+class Command(BaseCommand):
+    """
+    Compares query count, time and peak Python memory of dashboard statistics computed in Python
+    and by the SQL aggregate while the number of clients grows. Seeded rows are rolled back.
+    """
+    help = "Benchmark dashboard statistics: Python set of clients vs SQL aggregate."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                            help="Numbers of clients of the benchmark owner.")
+        parser.add_argument('--mailings', type=int, default=10, help="Every mailing gets all clients.")
+
+    def measure(self, function, owner):
+        tracemalloc.start()
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            value = function(owner)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return value, len(queries), elapsed, peak
+
+    def seed(self, clients, mailings):
+        now = timezone.now()
+        owner = User.objects.create(email='dashboard-benchmark@example.com', username='dashboard-benchmark')
+        message = Message.objects.create(title='Benchmark', text='Benchmark', owner=owner)
+        mailings = MailingSettings.objects.bulk_create([
+            MailingSettings(start_time=now, end_time=now + timedelta(days=1), periodicity=MailingSettings.DAILY,
+                            status=MailingSettings.STARTED, message=message, owner=owner)
+            for _ in range(mailings)
+        ])
+        clients = Client.objects.bulk_create(
+            [Client(FIO='Benchmark', email=f'client{number}@example.com', owner=owner) for number in range(clients)],
+            batch_size=5000
+        )
+        Through = MailingSettings.clients.through
+        Through.objects.bulk_create(
+            [Through(mailingsettings_id=mailing.pk, client_id=client.pk) for mailing in mailings for client in clients],
+            batch_size=5000
+        )
+        return owner
+
+    def handle(self, *args, **options):
+        for clients in options['clients']:
+            with transaction.atomic():
+                owner = self.seed(clients, options['mailings'])
+                for name, function in (('python set', count_clients_in_python),
+                                       ('sql aggregate', lambda user: compute_dashboard(user)['clients_count'])):
+                    value, queries, elapsed, peak = self.measure(function, owner)
+                    self.stdout.write(f"{clients} clients x {options['mailings']} mailings, {name}: "
+                                      f"clients_count={value}, {queries} queries, {elapsed * 1000:.1f} ms, "
+                                      f"peak memory {peak / 1024:.0f} KiB")
+                transaction.set_rollback(True)
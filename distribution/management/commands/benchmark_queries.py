@@ -0,0 +1,110 @@
+import time
+from datetime import timedelta
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from distribution.models import Log, MailingSettings, Message
+from users.models import User
+
+BENCHMARK_INDEXES = ['log_time_idx', 'log_owner_time_idx', 'mailing_due_idx']
+
+
+class Command(BaseCommand):
+    """
+    Seeds a large dataset and compares plans and timings of the hot Log and MailingSettings queries
+    without and with their indexes. Everything runs in one transaction which is rolled back at the end,
+    so neither seeded rows nor dropped indexes survive. Indexes are dropped under an exclusive lock,
+    run it on a staging database.
+    """
+    help = "Benchmark LogListView and dispatch task queries on a seeded dataset, PostgreSQL only."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logs', type=int, default=1_000_000)
+        parser.add_argument('--mailings', type=int, default=100_000)
+        parser.add_argument('--owners', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5, help="Runs of every query, best time is shown.")
+
+    def seed(self, options):
+        now = timezone.now()
+        owners = [
+            User(email=f'benchmark{number}@example.com', username=f'benchmark{number}')
+            for number in range(options['owners'])
+        ]
+        owners = User.objects.bulk_create(owners)
+        messages = Message.objects.bulk_create([Message(title='Benchmark', text='Benchmark', owner=owner)
+                                                for owner in owners])
+        periodicity = [choice for choice, _ in MailingSettings.PERIODICITY_CHOICES]
+        statuses = [choice for choice, _ in MailingSettings.STATUS_CHOICES]
+        mailings = MailingSettings.objects.bulk_create(
+            [
+                MailingSettings(
+                    start_time=now - timedelta(days=30),
+                    end_time=now + timedelta(days=30),
+                    periodicity=periodicity[number % len(periodicity)],
+                    status=statuses[number % len(statuses)],
+                    is_active=number % 4 == 0,
+                    next_send_at=now + timedelta(minutes=number % 10000 - 100),
+                    message=messages[number % len(messages)],
+                    owner=owners[number % len(owners)],
+                )
+                for number in range(options['mailings'])
+            ],
+            batch_size=5000
+        )
+        with connection.cursor() as cursor:
+            # one mailing per owner, one failed attempt of ten
+            cursor.execute(
+                f"""
+                INSERT INTO {Log._meta.db_table} (time, status, server_response, recipient, mailing_list_id, owner_id)
+                SELECT now() - i * interval '1 second', i %% 10 <> 0, 'OK', 'client' || i || '@example.com',
+                       (%s::bigint[])[1 + i %% %s], (%s::bigint[])[1 + i %% %s]
+                FROM generate_series(1, %s) AS i
+                """,
+                [[mailing.pk for mailing in mailings[:len(owners)]], len(owners),
+                 [owner.pk for owner in owners], len(owners), options['logs']]
+            )
+            cursor.execute(f"ANALYZE {Log._meta.db_table}")
+            cursor.execute(f"ANALYZE {MailingSettings._meta.db_table}")
+        return owners[0]
+
+    def get_queries(self, owner):
+        """
+        :returns: tuples (name, queryset)
+        """
+        return (
+            ('log list page', Log.objects.filter(owner=owner).order_by('-time')[:50]),
+            ('all logs page', Log.objects.order_by('-time')[:50]),
+            ('due mailings', MailingSettings.objects.filter(
+                status=MailingSettings.STARTED, is_active=True, next_send_at__lte=timezone.now())),
+        )
+
+    def run_queries(self, owner, options):
+        for name, queryset in self.get_queries(owner):
+            plan = queryset.explain()
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                list(queryset)
+                timings.append(time.perf_counter() - start)
+            scan = 'index scan' if 'Index' in plan else 'sequential scan'
+            self.stdout.write(f"  {name}: {min(timings) * 1000:.1f} ms, {scan}")
+            self.stdout.write('    ' + plan.replace('\n', '\n    '))
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Query plans are compared on PostgreSQL only.")
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {options['logs']} logs and {options['mailings']} mailings...")
+            owner = self.seed(options)
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for name in BENCHMARK_INDEXES:
+                        cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+                self.stdout.write("Without new indexes:")
+                self.run_queries(owner, options)
+                transaction.set_rollback(True)
+            self.stdout.write("With indexes:")
+            self.run_queries(owner, options)
+            transaction.set_rollback(True)
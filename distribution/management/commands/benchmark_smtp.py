@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management import BaseCommand
+
+from distribution.async_delivery import deliver_batch
+from distribution.services import deliver_message
+from distribution.smtp_sink import SMTPSink
+
+
+class Command(BaseCommand):
+    """
+    Compares SMTP delivery strategies against a local SMTP sink.
+    """
+    help = "Benchmark SMTP delivery: new connection per message, one reused connection, async engine."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500)
+        parser.add_argument('--handshake-delay', type=float, default=0.02,
+                            help="Seconds the sink waits before greeting, simulates TLS+AUTH cost.")
+        parser.add_argument('--message-delay', type=float, default=0.005,
+                            help="Seconds the sink takes to accept one message.")
+        parser.add_argument('--concurrency', type=int, default=10,
+                            help="SMTP sessions of the async engine.")
+
+    def sink_connection(self, sink):
+        return get_connection('django.core.mail.backends.smtp.EmailBackend', host='127.0.0.1',
+                              port=sink.port, username='', password='', use_tls=False)
+
+    def build_message(self, number, connection=None):
+        return EmailMessage(
+            subject='Benchmark',
+            body='Benchmark message body',
+            from_email='sender@example.com',
+            to=[f'client{number}@example.com'],
+            connection=connection
+        )
+
+    def run_per_message(self, sink, options):
+        start = time.perf_counter()
+        for number in range(options['messages']):
+            connection = self.sink_connection(sink)
+            connection.send_messages([self.build_message(number, connection)])
+        return time.perf_counter() - start
+
+    def run_shared(self, sink, options):
+        connection = self.sink_connection(sink)
+        start = time.perf_counter()
+        for number in range(options['messages']):
+            deliver_message(connection, self.build_message(number, connection))
+        connection.close()
+        return time.perf_counter() - start
+
+    def run_async(self, sink, options):
+        connections = [self.sink_connection(sink) for _ in range(options['concurrency'])]
+        messages = [self.build_message(number) for number in range(options['messages'])]
+        start = time.perf_counter()
+        asyncio.run(deliver_batch(messages, connections, deliver_message))
+        elapsed = time.perf_counter() - start
+        for connection in connections:
+            connection.close()
+        return elapsed
+
+    def handle(self, *args, **options):
+        runners = (
+            ('connection per message', self.run_per_message),
+            ('shared connection', self.run_shared),
+            (f"async engine, {options['concurrency']} sessions", self.run_async),
+        )
+        for name, runner in runners:
+            sink = SMTPSink(greeting_delay=options['handshake_delay'],
+                            message_delay=options['message_delay']).start()
+            cpu_start = time.process_time()
+            elapsed = runner(sink, options)
+            cpu = time.process_time() - cpu_start
+            sink.stop()
+            self.stdout.write(f"{name}: {sink.received} messages, {sink.connections} connections, "
+                              f"{elapsed:.2f}s, {sink.received / elapsed:.1f} msg/s, "
+                              f"{sink.received / max(cpu, 1e-6):.1f} msg per CPU second")
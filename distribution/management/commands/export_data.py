@@ -0,0 +1,47 @@
+import sys
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from distribution.exports import EXPORTS, CONTENT_TYPES, get_export_queryset, iter_export
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Streams logs or clients to a CSV or JSONL file with constant memory.
+    """
+    help = "Export delivery logs or clients filtered by owner, mailing and date range."
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=list(EXPORTS))
+        parser.add_argument('--format', choices=list(CONTENT_TYPES), default='csv')
+        parser.add_argument('--output', help="File path, stdout by default.")
+        parser.add_argument('--owner', help="Email of the owner.")
+        parser.add_argument('--mailing', type=int, help="Mailing settings id.")
+        parser.add_argument('--date-from', type=parse_date, help="YYYY-MM-DD, logs only.")
+        parser.add_argument('--date-to', type=parse_date, help="YYYY-MM-DD, logs only.")
+
+    def handle(self, *args, **options):
+        owner = None
+        if options['owner']:
+            owner = User.objects.filter(email=options['owner']).first()
+            if owner is None:
+                raise CommandError(f"User {options['owner']} was not found")
+        queryset = get_export_queryset(options['name'], owner=owner, mailing_id=options['mailing'],
+                                       date_from=options['date_from'], date_to=options['date_to'])
+        output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        start = time.perf_counter()
+        rows = 0
+        try:
+            for line in iter_export(queryset, options['name'], options['format']):
+                output.write(line)
+                rows += 1
+        finally:
+            if options['output']:
+                output.close()
+        if options['format'] == 'csv':
+            rows -= 1
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        self.stderr.write(f"{rows} rows exported in {elapsed:.2f}s, {rows / elapsed:.0f} rows/s")
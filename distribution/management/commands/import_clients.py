@@ -0,0 +1,40 @@
+from django.core.management import BaseCommand, CommandError
+
+from distribution.imports import IMPORT_FORMATS, ClientImportError, import_clients, iter_import_rows
+from distribution.models import MailingSettings
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Imports clients of the owner from a CSV or JSONL file in chunks.
+    """
+    help = "Bulk import clients from a CSV or JSONL file, optionally attaching them to a mailing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--owner', required=True, help="Email of the owner.")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, default='csv')
+        parser.add_argument('--mailing', type=int, help="Mailing settings id of the owner.")
+        parser.add_argument('--chunk-size', type=int)
+
+    def handle(self, *args, **options):
+        owner = User.objects.filter(email=options['owner']).first()
+        if owner is None:
+            raise CommandError(f"User {options['owner']} was not found")
+        mailing = None
+        if options['mailing']:
+            mailing = MailingSettings.objects.filter(pk=options['mailing'], owner=owner).first()
+            if mailing is None:
+                raise CommandError(f"Mailing {options['mailing']} of {options['owner']} was not found")
+        with open(options['path'], encoding='utf-8-sig', newline='') as file:
+            try:
+                result = import_clients(iter_import_rows(file, options['format']), owner, mailing,
+                                        options['chunk_size'])
+            except ClientImportError as e:
+                raise CommandError(f"Import was stopped: {e}. Saved {e.result['rows']} rows, "
+                                   f"{e.result['created']} clients created") from e
+        seconds = max(result['seconds'], 1e-6)
+        self.stdout.write(f"{result['rows']} rows: {result['created']} created, {result['duplicates']} duplicates, "
+                          f"{result['invalid']} invalid, {result['attached']} attached to mailing "
+                          f"in {seconds:.2f}s, {result['rows'] / seconds:.0f} rows/s")
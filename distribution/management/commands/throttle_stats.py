@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from distribution.throttling import get_wait_metrics
+
+
+class Command(BaseCommand):
+    """
+    Shows rate limiter queue wait metrics of the SMTP relay.
+    """
+    help = "Show total and average wait time for the relay rate limiter."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--relay', default=settings.EMAIL_HOST or 'default')
+
+    def handle(self, *args, **options):
+        metrics = get_wait_metrics(options['relay'])
+        self.stdout.write(f"relay {options['relay']}: {metrics['acquisitions']} sends, "
+                          f"waited {metrics['wait_seconds_total']:.2f}s, "
+                          f"average wait {metrics['average_wait'] * 1000:.1f}ms")
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.6 on 2026-10-17 17:15
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import migrations, models
+
+# historical models have no class constants, same values as MailingSettings.PERIODS
+PERIODS = {
+    'Раз в день': relativedelta(days=1),
+    'Раз в неделю': relativedelta(weeks=1),
+    'Раз в месяц': relativedelta(months=1),
+}
+
+
+def fill_next_send_at(apps, schema_editor):
+    """
+    Time of the last run is taken from the latest Log record of the mailing, next send time is the first
+    start_time + N * period after it, as MailingSettings.get_next_send_at computes it. So a mailing already
+    sent in the current period is not due right after deploy. Mailing without logs was never sent
+    and is due at start_time.
+    """
+    MailingSettings = apps.get_model('distribution', 'MailingSettings')
+    mailings = MailingSettings.objects.filter(next_send_at__isnull=True).annotate(
+        last_log_time=models.Max('log__time')
+    )
+    for mailing in mailings.iterator():
+        mailing.last_sent_at = mailing.last_log_time
+        mailing.next_send_at = mailing.start_time
+        if mailing.last_sent_at is not None:
+            period = PERIODS[mailing.periodicity]
+            steps = 1
+            mailing.next_send_at = mailing.start_time + period
+            while mailing.next_send_at <= mailing.last_sent_at:
+                steps += 1
+                mailing.next_send_at = mailing.start_time + period * steps
+        mailing.save(update_fields=['last_sent_at', 'next_send_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distribution', '0009_alter_client_options_alter_mailingsettings_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mailingsettings',
+            name='last_sent_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='время последней отправки'),
+        ),
+        migrations.AddField(
+            model_name='mailingsettings',
+            name='next_send_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='время следующей отправки'),
+        ),
+        migrations.AddIndex(
+            model_name='mailingsettings',
+            index=models.Index(fields=['status', 'is_active', 'next_send_at'], name='mailing_due_idx'),
+        ),
+        migrations.RunPython(fill_next_send_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distribution', '0010_mailingsettings_next_send_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='version',
+            field=models.PositiveIntegerField(default=1, verbose_name='версия содержимого'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-17 17:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distribution', '0011_message_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FailedDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.EmailField(max_length=254, verbose_name='email получателя')),
+                ('attempts', models.PositiveIntegerField(default=1, verbose_name='количество попыток')),
+                ('smtp_code', models.PositiveIntegerField(blank=True, null=True, verbose_name='код ответа почтового сервера')),
+                ('server_response', models.TextField(blank=True, null=True, verbose_name='ответ почтового сервера')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='дата и время')),
+                ('mailing_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='distribution.mailingsettings', verbose_name='рассылка')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='владелец')),
+            ],
+            options={
+                'verbose_name': 'недоставленное письмо',
+                'verbose_name_plural': 'недоставленные письма',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
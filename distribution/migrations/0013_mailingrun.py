@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-17 17:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distribution', '0012_faileddelivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MailingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('Выполняется', 'Выполняется'), ('Завершен', 'Завершен'), ('Прерван', 'Прерван')], default='Выполняется', max_length=50, verbose_name='статус запуска')),
+                ('fan_out', models.BooleanField(default=False, verbose_name='отправка параллельными подзадачами')),
+                ('cursor', models.CharField(blank=True, max_length=254, null=True, verbose_name='последний обработанный получатель')),
+                ('sent', models.PositiveIntegerField(default=0, verbose_name='отправлено')),
+                ('failed', models.PositiveIntegerField(default=0, verbose_name='ошибок')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='время начала')),
+                ('checkpoint_at', models.DateTimeField(auto_now=True, verbose_name='время последней контрольной точки')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='время окончания')),
+                ('mailing_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='runs', to='distribution.mailingsettings', verbose_name='рассылка')),
+            ],
+            options={
+                'verbose_name': 'запуск рассылки',
+                'verbose_name_plural': 'запуски рассылок',
+                'indexes': [models.Index(fields=['status', 'checkpoint_at'], name='mailing_run_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-17 17:23
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distribution', '0013_mailingrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mailingrun',
+            name='materialized',
+            field=models.BooleanField(default=False, verbose_name='получатели записаны в очередь отправки'),
+        ),
+        migrations.CreateModel(
+            name='OutboxEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.EmailField(max_length=254, verbose_name='email получателя')),
+                ('state', models.CharField(choices=[('Ожидает', 'Ожидает'), ('Отправляется', 'Отправляется'), ('Отправлено', 'Отправлено'), ('Ошибка', 'Ошибка')], default='Ожидает', max_length=50, verbose_name='состояние')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='количество попыток')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='время следующей попытки')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='время захвата обработчиком')),
+                ('mailing_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='distribution.mailingsettings', verbose_name='рассылка')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox', to='distribution.mailingrun', verbose_name='запуск рассылки')),
+            ],
+            options={
+                'verbose_name': 'письмо в очереди отправки',
+                'verbose_name_plural': 'очередь отправки',
+                'indexes': [models.Index(fields=['state', 'next_attempt_at'], name='outbox_claim_idx')],
+                'constraints': [models.UniqueConstraint(fields=('run', 'recipient'), name='outbox_run_recipient_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-17 17:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_run_period(apps, schema_editor):
+    MailingRun = apps.get_model('distribution', 'MailingRun')
+    MailingRun.objects.filter(period__isnull=True).update(period=models.F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distribution', '0014_outboxemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mailingrun',
+            name='period',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='период рассылки'),
+        ),
+        migrations.CreateModel(
+            name='DeliveryState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.EmailField(max_length=254, verbose_name='email получателя')),
+                ('period', models.DateTimeField(verbose_name='период рассылки')),
+                ('state', models.CharField(choices=[('Ожидает повтора', 'Ожидает повтора'), ('Отправлено', 'Отправлено'), ('Ошибка', 'Ошибка')], max_length=50, verbose_name='состояние доставки')),
+                ('attempts', models.PositiveIntegerField(default=1, verbose_name='количество попыток')),
+                ('server_response', models.TextField(blank=True, null=True, verbose_name='ответ почтового сервера')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='время последней попытки')),
+                ('mailing_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='distribution.mailingsettings', verbose_name='рассылка')),
+            ],
+            options={
+                'verbose_name': 'состояние доставки',
+                'verbose_name_plural': 'состояния доставки',
+                'constraints': [models.UniqueConstraint(fields=('mailing_list', 'recipient', 'period'), name='delivery_state_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_run_period, migrations.RunPython.noop),
+    ]
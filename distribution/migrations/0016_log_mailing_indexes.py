@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-17 17:27
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # indexes are built without locking writes to the tables, this can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('distribution', '0015_deliverystate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='log',
+            index=models.Index(fields=['-time'], name='log_time_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='log',
+            index=models.Index(fields=['owner', '-time'], name='log_owner_time_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='log',
+            index=models.Index(fields=['owner', 'status'], name='log_owner_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='log',
+            index=models.Index(condition=models.Q(('status', False)), fields=['owner', '-time'], name='log_failed_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='mailingsettings',
+            index=models.Index(condition=models.Q(('is_active', True), ('status', 'Запущена')), fields=['periodicity', 'next_send_at'], name='mailing_active_period_idx'),
+        ),
+    ]
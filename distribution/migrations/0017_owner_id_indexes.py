@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-17 17:29
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # indexes are built without locking writes to the tables, this can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('distribution', '0016_log_mailing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='client',
+            index=models.Index(fields=['owner', 'id'], name='client_owner_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='mailingsettings',
+            index=models.Index(fields=['owner', 'id'], name='mailing_owner_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='message',
+            index=models.Index(fields=['owner', 'id'], name='message_owner_id_idx'),
+        ),
+    ]
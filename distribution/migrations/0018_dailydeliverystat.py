@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-17 17:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def fill_daily_stats(apps, schema_editor):
+    Log = apps.get_model('distribution', 'Log')
+    DailyDeliveryStat = apps.get_model('distribution', 'DailyDeliveryStat')
+    rows = Log.objects.annotate(day=TruncDate('time')).values('mailing_list_id', 'owner_id', 'day').annotate(
+        sent=models.Count('id', filter=models.Q(status=True)),
+        failed=models.Count('id', filter=models.Q(status=False)),
+    ).order_by()
+    DailyDeliveryStat.objects.bulk_create((DailyDeliveryStat(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distribution', '0017_owner_id_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyDeliveryStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='день')),
+                ('sent', models.PositiveIntegerField(default=0, verbose_name='успешно отправлено')),
+                ('failed', models.PositiveIntegerField(default=0, verbose_name='ошибок')),
+                ('mailing_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='distribution.mailingsettings', verbose_name='рассылка')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='владелец')),
+            ],
+            options={
+                'verbose_name': 'статистика отправки за день',
+                'verbose_name_plural': 'статистика отправки по дням',
+                'indexes': [models.Index(fields=['owner', 'day'], name='daily_stat_owner_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('mailing_list', 'day'), name='daily_stat_mailing_day_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.6 on 2026-10-17 17:36
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # index is built without locking writes to the table, this can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('distribution', '0018_dailydeliverystat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='mailingsettings',
+            index=models.Index(condition=models.Q(('status', 'Завершена'), _negated=True), fields=['end_time'], name='mailing_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-17 18:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # indexes are built and dropped without locking writes to the table, this can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('distribution', '0019_mailing_expiry_idx'),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name='outboxemail',
+            name='outbox_claim_idx',
+        ),
+        AddIndexConcurrently(
+            model_name='outboxemail',
+            index=models.Index(condition=models.Q(('state', 'Ожидает')), fields=['next_attempt_at'], name='outbox_claim_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='outboxemail',
+            index=models.Index(fields=['run', 'state'], name='outbox_run_state_idx'),
+        ),
+        migrations.RemoveField(
+            model_name='mailingrun',
+            name='fan_out',
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-17 18:20
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # index is built without locking writes to the table, this can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('distribution', '0020_outbox_partial_claim_idx'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='deliverystate',
+            index=models.Index(fields=['period'], name='delivery_state_period_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-17 18:30
+
+from django.contrib.postgres.operations import RemoveIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # indexes are dropped without locking writes to the table, this can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('distribution', '0021_delivery_state_period_idx'),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name='log',
+            name='log_owner_status_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='log',
+            name='log_failed_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='mailingsettings',
+            name='mailing_active_period_idx',
+        ),
+    ]
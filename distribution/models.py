@@ -1,7 +1,13 @@
+import logging
+
+from dateutil.relativedelta import relativedelta
 from django.db import models
+from django.utils import timezone
 
 from users.models import User
 
+logger = logging.getLogger(__name__)
+
 NULLABLE = {'null': True, 'blank': True}
 
 
@@ -21,24 +27,38 @@ class Client(models.Model):
         permissions = [
             ("can_see_all_clients", "Can see all clients"),
         ]
+        indexes = [
+            models.Index(fields=['owner', 'id'], name='client_owner_id_idx'),
+        ]
 
 
 class Message(models.Model):
     title = models.CharField(max_length=100, verbose_name='тема письма')
     text = models.TextField(verbose_name='тело письма')
-
+    version = models.PositiveIntegerField(default=1, verbose_name='версия содержимого')
 
     owner = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='владелец')
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        """
+        Increments version on every update, so cached MIME template of the previous version is not used.
+        """
+        if self.pk:
+            self.version += 1
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'сообщение'
         verbose_name_plural = 'сообщения'
         permissions = [
             ("can_see_all_messages", "Can see all messages"),
         ]
+        indexes = [
+            models.Index(fields=['owner', 'id'], name='message_owner_id_idx'),
+        ]
 
 
 class MailingSettings(models.Model):
@@ -52,6 +72,12 @@ class MailingSettings(models.Model):
         (MONTHLY, "Раз в месяц"),
     ]
 
+    PERIODS = {
+        DAILY: relativedelta(days=1),
+        WEEKLY: relativedelta(weeks=1),
+        MONTHLY: relativedelta(months=1),
+    }
+
     CREATED = 'Создана'
     STARTED = 'Запущена'
     COMPLETED = 'Завершена'
@@ -67,6 +93,8 @@ class MailingSettings(models.Model):
     periodicity = models.CharField(max_length=50, verbose_name='периодичность', choices=PERIODICITY_CHOICES)
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default=CREATED, verbose_name='статус рассылки')
     is_active = models.BooleanField(default=False, verbose_name='активность рассылки')
+    next_send_at = models.DateTimeField(verbose_name='время следующей отправки', **NULLABLE)
+    last_sent_at = models.DateTimeField(verbose_name='время последней отправки', **NULLABLE)
 
     message = models.ForeignKey(Message, on_delete=models.CASCADE, verbose_name='сообщение', related_name='messages',
                                 **NULLABLE)
@@ -78,12 +106,52 @@ class MailingSettings(models.Model):
                f" периодичность: {self.periodicity}," \
                f" статус: {self.status}"
 
+    def get_next_send_at(self):
+        """
+        Next send time is start_time for a mailing that was never sent, otherwise the first
+        start_time + N * period after last_sent_at. Counting from start_time keeps the schedule from drifting.
+        :returns: datetime
+        """
+        if self.last_sent_at is None:
+            return self.start_time
+        period = self.PERIODS[self.periodicity]
+        steps = 1
+        next_send_at = self.start_time + period
+        while next_send_at <= self.last_sent_at:
+            steps += 1
+            next_send_at = self.start_time + period * steps
+        return next_send_at
+
+    def mark_sent(self, sent_at):
+        """
+        Saves time of the current run and moves next_send_at to the next period.
+        :param sent_at: datetime of the run
+        """
+        self.last_sent_at = sent_at
+        self.save(update_fields=['last_sent_at'])
+
+    def save(self, *args, **kwargs):
+        """
+        Keeps next_send_at in sync with start_time, periodicity and last_sent_at.
+        """
+        self.next_send_at = self.get_next_send_at()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'next_send_at' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'next_send_at']
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'настройки рассылки'
         verbose_name_plural = 'настройки рассылки'
         permissions = [
             ("can_see_all_mailing_settings", "Can see all mailing settings"),
         ]
+        indexes = [
+            models.Index(fields=['status', 'is_active', 'next_send_at'], name='mailing_due_idx'),
+            models.Index(fields=['owner', 'id'], name='mailing_owner_id_idx'),
+            # expiry sweeper looks only at mailings which are not completed yet
+            models.Index(fields=['end_time'], name='mailing_expiry_idx', condition=~models.Q(status='Завершена')),
+        ]
 
 
 class Log(models.Model):
@@ -105,3 +173,182 @@ class Log(models.Model):
             ("can_see_all_logs", "Can see all logs"),
         ]
         ordering = ['-time']
+        indexes = [
+            models.Index(fields=['-time'], name='log_time_idx'),
+            models.Index(fields=['owner', '-time'], name='log_owner_time_idx'),
+        ]
+
+
+class DailyDeliveryStat(models.Model):
+    day = models.DateField(verbose_name='день')
+    sent = models.PositiveIntegerField(default=0, verbose_name='успешно отправлено')
+    failed = models.PositiveIntegerField(default=0, verbose_name='ошибок')
+
+    mailing_list = models.ForeignKey(MailingSettings, on_delete=models.CASCADE, verbose_name='рассылка')
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='владелец')
+
+    def __str__(self):
+        return f'{self.mailing_list_id} {self.day} {self.sent}/{self.failed}'
+
+    class Meta:
+        verbose_name = 'статистика отправки за день'
+        verbose_name_plural = 'статистика отправки по дням'
+        constraints = [
+            models.UniqueConstraint(fields=['mailing_list', 'day'], name='daily_stat_mailing_day_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', 'day'], name='daily_stat_owner_day_idx'),
+        ]
+
+
+class MailingRun(models.Model):
+    RUNNING = 'Выполняется'
+    COMPLETED = 'Завершен'
+    INTERRUPTED = 'Прерван'
+
+    STATUS_CHOICES = [
+        (RUNNING, "Выполняется"),
+        (COMPLETED, "Завершен"),
+        (INTERRUPTED, "Прерван"),
+    ]
+
+    status = models.CharField(max_length=50, choices=STATUS_CHOICES, default=RUNNING, verbose_name='статус запуска')
+    materialized = models.BooleanField(default=False, verbose_name='получатели записаны в очередь отправки')
+    cursor = models.CharField(max_length=254, verbose_name='последний обработанный получатель', **NULLABLE)
+    period = models.DateTimeField(verbose_name='период рассылки', **NULLABLE)
+    sent = models.PositiveIntegerField(default=0, verbose_name='отправлено')
+    failed = models.PositiveIntegerField(default=0, verbose_name='ошибок')
+    started_at = models.DateTimeField(auto_now_add=True, verbose_name='время начала')
+    checkpoint_at = models.DateTimeField(auto_now=True, verbose_name='время последней контрольной точки')
+    finished_at = models.DateTimeField(verbose_name='время окончания', **NULLABLE)
+
+    mailing_list = models.ForeignKey(MailingSettings, on_delete=models.CASCADE, verbose_name='рассылка',
+                                     related_name='runs')
+
+    def __str__(self):
+        return f'{self.mailing_list_id} {self.started_at} {self.status}'
+
+    def checkpoint(self, cursor):
+        """
+        Saves position of the run after a batch of recipients was written to the outbox.
+        :param cursor: last recipient email of the batch
+        """
+        self.cursor = cursor
+        self.save(update_fields=['cursor', 'checkpoint_at'])
+
+    def finish(self, status=COMPLETED):
+        self.status = status
+        self.finished_at = timezone.now()
+        self.save(update_fields=['status', 'finished_at', 'checkpoint_at'])
+
+    def finish_if_drained(self):
+        """
+        Finishes materialized run which has no pending or sending emails in the outbox left.
+        Safe to call from several workers: only a running run is updated.
+        """
+        if self.outbox.filter(state__in=[OutboxEmail.PENDING, OutboxEmail.SENDING]).exists():
+            return
+        if MailingRun.objects.filter(pk=self.pk, status=MailingRun.RUNNING, materialized=True).update(
+                status=MailingRun.COMPLETED, finished_at=timezone.now()):
+            logger.info(f"Run {self.pk} of mailing with id {self.mailing_list_id} was completed")
+
+    class Meta:
+        verbose_name = 'запуск рассылки'
+        verbose_name_plural = 'запуски рассылок'
+        indexes = [
+            models.Index(fields=['status', 'checkpoint_at'], name='mailing_run_status_idx'),
+        ]
+
+
+class OutboxEmail(models.Model):
+    PENDING = 'Ожидает'
+    SENDING = 'Отправляется'
+    SENT = 'Отправлено'
+    FAILED = 'Ошибка'
+
+    STATE_CHOICES = [
+        (PENDING, "Ожидает"),
+        (SENDING, "Отправляется"),
+        (SENT, "Отправлено"),
+        (FAILED, "Ошибка"),
+    ]
+
+    recipient = models.EmailField(max_length=254, verbose_name='email получателя')
+    state = models.CharField(max_length=50, choices=STATE_CHOICES, default=PENDING, verbose_name='состояние')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='количество попыток')
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name='время следующей попытки')
+    claimed_at = models.DateTimeField(verbose_name='время захвата обработчиком', **NULLABLE)
+
+    mailing_list = models.ForeignKey(MailingSettings, on_delete=models.CASCADE, verbose_name='рассылка')
+    run = models.ForeignKey(MailingRun, on_delete=models.CASCADE, verbose_name='запуск рассылки',
+                            related_name='outbox')
+
+    def __str__(self):
+        return f'{self.recipient} {self.state}'
+
+    class Meta:
+        verbose_name = 'письмо в очереди отправки'
+        verbose_name_plural = 'очередь отправки'
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'recipient'], name='outbox_run_recipient_uniq'),
+        ]
+        indexes = [
+            # only pending emails are claimed, sent and failed rows stay out of the index
+            models.Index(fields=['next_attempt_at'], name='outbox_claim_idx', condition=models.Q(state='Ожидает')),
+            # pending and sending emails of a run are looked up by finish_if_drained after every batch
+            models.Index(fields=['run', 'state'], name='outbox_run_state_idx'),
+        ]
+
+
+class DeliveryState(models.Model):
+    PENDING = 'Ожидает повтора'
+    SENT = 'Отправлено'
+    FAILED = 'Ошибка'
+
+    STATE_CHOICES = [
+        (PENDING, "Ожидает повтора"),
+        (SENT, "Отправлено"),
+        (FAILED, "Ошибка"),
+    ]
+
+    recipient = models.EmailField(max_length=254, verbose_name='email получателя')
+    period = models.DateTimeField(verbose_name='период рассылки')
+    state = models.CharField(max_length=50, choices=STATE_CHOICES, verbose_name='состояние доставки')
+    attempts = models.PositiveIntegerField(default=1, verbose_name='количество попыток')
+    server_response = models.TextField(verbose_name='ответ почтового сервера', **NULLABLE)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='время последней попытки')
+
+    mailing_list = models.ForeignKey(MailingSettings, on_delete=models.CASCADE, verbose_name='рассылка')
+
+    def __str__(self):
+        return f'{self.recipient} {self.period} {self.state}'
+
+    class Meta:
+        verbose_name = 'состояние доставки'
+        verbose_name_plural = 'состояния доставки'
+        constraints = [
+            models.UniqueConstraint(fields=['mailing_list', 'recipient', 'period'], name='delivery_state_uniq'),
+        ]
+        indexes = [
+            # states of past periods are pruned by the retention task
+            models.Index(fields=['period'], name='delivery_state_period_idx'),
+        ]
+
+
+class FailedDelivery(models.Model):
+    recipient = models.EmailField(verbose_name='email получателя')
+    attempts = models.PositiveIntegerField(default=1, verbose_name='количество попыток')
+    smtp_code = models.PositiveIntegerField(verbose_name='код ответа почтового сервера', **NULLABLE)
+    server_response = models.TextField(verbose_name='ответ почтового сервера', **NULLABLE)
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='дата и время')
+
+    mailing_list = models.ForeignKey(MailingSettings, on_delete=models.CASCADE, verbose_name='рассылка')
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='владелец')
+
+    def __str__(self):
+        return f'{self.recipient} {self.smtp_code}'
+
+    class Meta:
+        verbose_name = 'недоставленное письмо'
+        verbose_name_plural = 'недоставленные письма'
+        ordering = ['-created_at']
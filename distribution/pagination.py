@@ -0,0 +1,100 @@
+from datetime import datetime
+
+from django.http import Http404
+
+
+class KeysetPaginationMixin:
+    """
+    Keyset pagination for ListView. Next page is selected by the ordering key of the last shown object
+    instead of OFFSET, so every page is one range scan of an index and page N costs the same as page 1.
+    Subclasses define the ordering in get_page and the key of an object in make_cursor.
+    """
+    paginate_by = 50
+    cursor_param = 'after'
+
+    def get_page(self, queryset, cursor, size):
+        """
+        :param queryset: filtered queryset of the view
+        :param cursor: key of the last object of the previous page, None for the first page
+        :param size: number of objects to select
+        :returns: list of objects
+        """
+        raise NotImplementedError
+
+    def make_cursor(self, obj):
+        """
+        :returns: string key of the object used as cursor of the next page
+        """
+        raise NotImplementedError
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Replaces offset pagination of MultipleObjectMixin. One extra object is selected to know
+        if the next page exists.
+        :returns: tuple (paginator, page, object_list, is_paginated), paginator and page are None
+        """
+        try:
+            objects = self.get_page(queryset, self.request.GET.get(self.cursor_param) or None, page_size + 1)
+        except (TypeError, ValueError):
+            raise Http404("Invalid page cursor")
+        self.next_cursor = self.make_cursor(objects[page_size - 1]) if len(objects) > page_size else None
+        return None, None, objects[:page_size], self.next_cursor is not None
+
+    def get_context_data(self, *args, **kwargs):
+        """
+        Adds query strings of the next and the first page for the keyset_pagination.html include,
+        other GET parameters of the request are kept.
+        :returns: context_data
+        """
+        context_data = super().get_context_data(*args, **kwargs)
+        query = self.request.GET.copy()
+        query.pop(self.cursor_param, None)
+        context_data['first_page_query'] = query.urlencode() if self.cursor_param in self.request.GET else None
+        next_cursor = getattr(self, 'next_cursor', None)
+        if next_cursor:
+            query[self.cursor_param] = next_cursor
+            context_data['next_page_query'] = query.urlencode()
+        return context_data
+
+
+class TimeKeysetPaginationMixin(KeysetPaginationMixin):
+    """
+    Newest objects first, ordered by (time, id).
+    """
+
+    def get_page(self, queryset, cursor, size):
+        queryset = queryset.order_by('-time', '-pk')
+        if cursor:
+            time, pk = cursor.rsplit('_', 1)
+            time = datetime.fromisoformat(time)
+            queryset = queryset.filter(time__lte=time).exclude(time=time, pk__gte=int(pk))
+        return list(queryset[:size])
+
+    def make_cursor(self, obj):
+        return f'{obj.time.isoformat()}_{obj.pk}'
+
+
+class OwnerFirstKeysetPaginationMixin(KeysetPaginationMixin):
+    """
+    Objects of the current user first, then objects of others, both newest first.
+    Each group is selected by its own query ordered by (owner, id), so no ordering by expression is needed.
+    """
+
+    def get_page(self, queryset, cursor, size):
+        group, pk = (int(part) for part in cursor.split('_')) if cursor else (1, None)
+        objects = []
+        if group == 1:
+            own = queryset.filter(owner=self.request.user).order_by('-pk')
+            if pk is not None:
+                own = own.filter(pk__lt=pk)
+            objects = list(own[:size])
+            pk = None
+        if len(objects) < size:
+            others = queryset.exclude(owner=self.request.user).order_by('-pk')
+            if pk is not None:
+                others = others.filter(pk__lt=pk)
+            objects += list(others[:size - len(objects)])
+        return objects
+
+    def make_cursor(self, obj):
+        return f'{1 if obj.owner_id == self.request.user.pk else 2}_{obj.pk}'
@@ -0,0 +1,93 @@
+from email.utils import formatdate, make_msgid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage
+from django.core.mail.message import sanitize_address
+from django.core.mail.utils import DNS_NAME
+
+_local_templates = {}
+
+
+def get_template_key(message_id, version):
+    return f'mailing:mime:{message_id}:{version}'
+
+
+def render_message_template(message):
+    """
+    Renders message into serialized MIME without per-recipient headers (To, Date, Message-ID).
+    :param message: Message instance
+    :returns: bytes
+    """
+    email = EmailMessage(subject=message.title, body=message.text, from_email=settings.EMAIL_HOST_USER)
+    mime = email.message()
+    del mime['Date']
+    del mime['Message-ID']
+    return mime.as_bytes(linesep='\r\n')
+
+
+def get_message_template(message):
+    """
+    Returns MIME template of the message from the in-process cache, then from Redis cache,
+    rendering it only if both miss. Key contains message version, so an edited message is rendered again.
+    :param message: Message instance
+    :returns: bytes
+    """
+    key = get_template_key(message.pk, message.version)
+    template = _local_templates.get(key)
+    if template is None:
+        template = cache.get(key)
+        if template is None:
+            template = render_message_template(message)
+            cache.set(key, template, settings.MIME_CACHE_TIMEOUT)
+        if len(_local_templates) >= settings.MIME_LOCAL_CACHE_SIZE:
+            _local_templates.clear()
+        _local_templates[key] = template
+    return template
+
+
+def invalidate_message_template(message_id, version):
+    """
+    Drops cached MIME template of the given message version.
+    """
+    key = get_template_key(message_id, version)
+    cache.delete(key)
+    _local_templates.pop(key, None)
+
+
+class PreparedMessage:
+    """
+    Message of a mailing addressed to one recipient. Only envelope and a few headers
+    are added to the shared MIME template when the message is sent.
+    """
+
+    def __init__(self, message, from_email, recipient, template):
+        self.message = message
+        self.from_email = from_email
+        self.to = [recipient]
+        self.template = template
+
+    def envelope(self):
+        """
+        Sender and recipients encoded the same way as EmailBackend does it: IDN domains to punycode,
+        non-ASCII local parts and names to encoded words.
+        :returns: tuple (from_email, list of recipients)
+        """
+        encoding = settings.DEFAULT_CHARSET
+        return sanitize_address(self.from_email, encoding), [sanitize_address(addr, encoding) for addr in self.to]
+
+    def payload(self):
+        """
+        :returns: bytes ready for SMTP DATA command
+        """
+        headers = (f"To: {sanitize_address(self.to[0], settings.DEFAULT_CHARSET)}\r\n"
+                   f"Date: {formatdate(localtime=settings.EMAIL_USE_LOCALTIME)}\r\n"
+                   f"Message-ID: {make_msgid(domain=DNS_NAME)}\r\n")
+        return headers.encode() + self.template
+
+    def as_email_message(self):
+        """
+        :returns: EmailMessage for email backends other than SMTP
+        """
+        return EmailMessage(subject=self.message.title, body=self.message.text,
+                            from_email=self.from_email, to=self.to)
@@ -0,0 +1,15 @@
+import redis
+from django.conf import settings
+
+_redis = None
+
+
+def get_redis():
+    """
+    Returns Redis client shared by the current process. Used for coordination between celery workers.
+    :returns: redis.Redis instance
+    """
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(settings.MAILING_REDIS_URL)
+    return _redis
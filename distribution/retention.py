@@ -0,0 +1,127 @@
+import gzip
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from distribution.exports import EXPORTS, CONTENT_TYPES, iter_lines
+from distribution.models import Log, MailingRun, OutboxEmail, DeliveryState, MailingSettings
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = EXPORTS['logs']['fields']
+
+
+class ArchiveWriter:
+    """
+    Writes Log rows to a gzip compressed JSONL or CSV file.
+    """
+
+    def __init__(self, path, fmt):
+        if fmt not in CONTENT_TYPES:
+            raise ValueError(f"Unknown archive format {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.header = True
+        self.file = gzip.open(path, 'wt', encoding='utf-8', newline='')
+
+    def write(self, rows):
+        self.file.writelines(iter_lines(rows, ARCHIVE_FIELDS, self.fmt, header=self.header))
+        self.header = False
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def archive_logs(days=None, batch_size=None, fmt=None, archive_dir=None):
+    """
+    Moves Log records older than days to a compressed archive file. Rows are read in batches by the
+    (time, id) order of log_time_idx, every batch is written to the file before it is deleted, so a crashed
+    run may only leave duplicates in the archive, never lose rows. DailyDeliveryStat is not touched,
+    so statistics of archived days stay intact.
+    :param days: retention age, settings.LOG_RETENTION_DAYS by default
+    :param batch_size: rows per batch, settings.LOG_RETENTION_BATCH_SIZE by default
+    :param fmt: 'jsonl' or 'csv', settings.LOG_ARCHIVE_FORMAT by default
+    :param archive_dir: directory of archive files, settings.LOG_ARCHIVE_DIR by default
+    :returns: dict with archived rows count, archive path, archive size in bytes and elapsed seconds
+    """
+    days = settings.LOG_RETENTION_DAYS if days is None else days
+    batch_size = batch_size or settings.LOG_RETENTION_BATCH_SIZE
+    fmt = fmt or settings.LOG_ARCHIVE_FORMAT
+    archive_dir = archive_dir or settings.LOG_ARCHIVE_DIR
+    started = time.monotonic()
+    now = timezone.now()
+    cutoff = now - timedelta(days=days)
+    old_logs = Log.objects.filter(time__lt=cutoff).order_by('time', 'pk').values(*ARCHIVE_FIELDS)
+
+    result = {'archived': 0, 'path': None, 'bytes': 0, 'seconds': 0.0}
+    rows = list(old_logs[:batch_size])
+    if rows:
+        os.makedirs(archive_dir, exist_ok=True)
+        path = os.path.join(archive_dir, f"logs-before-{cutoff:%Y%m%d}-{now:%Y%m%d%H%M%S}.{fmt}.gz")
+        writer = ArchiveWriter(path, fmt)
+        try:
+            while rows:
+                writer.write(rows)
+                Log.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+                result['archived'] += len(rows)
+                # continue after the last row, so dead index entries of deleted rows are not scanned again
+                last = rows[-1]
+                rows = list(old_logs.filter(time__gte=last['time']).exclude(
+                    time=last['time'], pk__lte=last['id'])[:batch_size])
+        finally:
+            writer.close()
+        result['path'] = path
+        result['bytes'] = os.path.getsize(path)
+    result['seconds'] = time.monotonic() - started
+    logger.info(f"{result['archived']} log records older than {cutoff} were archived to {result['path']} "
+                f"in {result['seconds']:.1f}s")
+    return result
+
+
+def purge_outbox(days=None, batch_size=None):
+    """
+    Deletes outbox emails of runs finished more than days ago in batches by the run index.
+    Delivered recipients are kept in DeliveryState and failed ones in FailedDelivery,
+    emails left pending by interrupted runs are dropped with them.
+    :param days: retention age, settings.OUTBOX_RETENTION_DAYS by default
+    :param batch_size: rows per batch, settings.LOG_RETENTION_BATCH_SIZE by default
+    :returns: number of deleted outbox emails
+    """
+    days = settings.OUTBOX_RETENTION_DAYS if days is None else days
+    batch_size = batch_size or settings.LOG_RETENTION_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(days=days)
+    run_ids = MailingRun.objects.filter(
+        finished_at__lt=cutoff
+    ).exclude(status=MailingRun.RUNNING).filter(
+        Exists(OutboxEmail.objects.filter(run=OuterRef('pk')))
+    ).values_list('pk', flat=True)
+    deleted = 0
+    for run_id in run_ids:
+        while ids := list(OutboxEmail.objects.filter(run_id=run_id).values_list('pk', flat=True)[:batch_size]):
+            deleted += OutboxEmail.objects.filter(pk__in=ids).delete()[0]
+    logger.info(f"{deleted} outbox emails of runs finished before {cutoff} were deleted")
+    return deleted
+
+
+def prune_delivery_states(batch_size=None):
+    """
+    Deletes delivery states of periods older than the longest periodicity. Recipients are deduplicated
+    only within the period of a run, so states of past periods are never read again.
+    :param batch_size: rows per batch, settings.LOG_RETENTION_BATCH_SIZE by default
+    :returns: number of deleted delivery states
+    """
+    batch_size = batch_size or settings.LOG_RETENTION_BATCH_SIZE
+    now = timezone.now()
+    cutoff = min(now - period for period in MailingSettings.PERIODS.values())
+    old_states = DeliveryState.objects.filter(period__lt=cutoff)
+    deleted = 0
+    while ids := list(old_states.values_list('pk', flat=True)[:batch_size]):
+        deleted += DeliveryState.objects.filter(pk__in=ids).delete()[0]
+    logger.info(f"{deleted} delivery states of periods before {cutoff} were deleted")
+    return deleted
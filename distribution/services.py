@@ -1,56 +1,639 @@
 import logging
-from smtplib import SMTPException
-from django.core.mail import send_mail
+import random
+import time
+from datetime import timedelta
+from smtplib import SMTPException, SMTPServerDisconnected, SMTPResponseException, SMTPRecipientsRefused
+from django.core.mail import get_connection
+from django.core.mail.backends.smtp import EmailBackend as SMTPEmailBackend
 from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import F, Sum
+from django.db.models.functions import Lower, Trim
 from django.utils import timezone
-from distribution.models import MailingSettings, Log
+from distribution.async_delivery import run_batch
+from distribution.dashboard import bump_dashboard_version
+from distribution.locks import Lease
+from distribution.models import MailingSettings, Log, Client, FailedDelivery, MailingRun, OutboxEmail, \
+    DeliveryState, DailyDeliveryStat
+from distribution.payloads import PreparedMessage, get_message_template
+from distribution.throttling import RelayLimiter, ThrottleTimeout, throttle, release_connection_slot
 
 logger = logging.getLogger(__name__)
 
+_mail_connection = None
+
+
+def get_mail_connection():
+    """
+    Returns SMTP connection shared by all mailings sent from the current worker process.
+    Connection is created lazily and stays open between messages and mailings.
+    :returns: email backend instance
+    """
+    global _mail_connection
+    if _mail_connection is None:
+        _mail_connection = get_connection(fail_silently=False)
+    return _mail_connection
+
+
+def close_mail_connection():
+    """
+    Closes shared SMTP connection of the current worker process.
+    """
+    global _mail_connection
+    if _mail_connection is not None:
+        _mail_connection.close()
+        release_connection_slot(_mail_connection)
+        _mail_connection = None
+
+
+def send_over_connection(connection, message):
+    """
+    PreparedMessage is written to SMTP as is, only envelope and per-recipient headers are added
+    to its cached MIME template. Other backends get a regular EmailMessage.
+    :returns: number of sent messages
+    """
+    if isinstance(message, PreparedMessage):
+        if isinstance(connection, SMTPEmailBackend):
+            from_email, recipients = message.envelope()
+            connection.connection.sendmail(from_email, recipients, message.payload())
+            return 1
+        message = message.as_email_message()
+    return connection.send_messages([message])
+
+
+def deliver_message(connection, message):
+    """
+    Waits for the cluster-wide relay rate limiter and sends message over already opened connection.
+    If server has dropped the connection (idle timeout, relay restart) - reconnects and sends message once again.
+    :param connection: email backend instance
+    :param message: PreparedMessage or EmailMessage instance
+    :returns: number of sent messages
+    """
+    throttle(connection, message.from_email)
+    if getattr(connection, 'connection', None) is None:
+        connection.open()
+    try:
+        return send_over_connection(connection, message)
+    except (SMTPServerDisconnected, ConnectionError) as error:
+        logger.warning(f"SMTP connection was lost ({error}), reconnecting")
+        connection.close()
+        connection.open()
+        return send_over_connection(connection, message)
+
+
+class LogBuffer:
+    """
+    Collects delivery results in memory and writes them to Log with one bulk_create per batch.
+    Buffer is flushed when size records are collected or interval seconds passed since the last flush
+    and always on exit from the context manager, including exit by exception.
+    """
+
+    def __init__(self, size=None, interval=None):
+        self.size = size or settings.LOG_BUFFER_SIZE
+        self.interval = settings.LOG_BUFFER_SECONDS if interval is None else interval
+        self.logs = []
+        self.flushed_at = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def add(self, **fields):
+        """
+        Adds Log instance to the buffer and flushes buffer if it is full or expired.
+        :param fields: Log fields
+        """
+        self.logs.append(Log(**fields))
+        if len(self.logs) >= self.size or time.monotonic() - self.flushed_at >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes buffered Log instances with one query per batch and adds them to the daily rollup
+        in the same transaction.
+        """
+        if self.logs:
+            with transaction.atomic():
+                Log.objects.bulk_create(self.logs, batch_size=self.size)
+                update_daily_stats(self.logs)
+            # bulk_create sends no post_save signals
+            bump_dashboard_version(*(log.owner_id for log in self.logs))
+            self.logs = []
+        self.flushed_at = time.monotonic()
+
+
+def update_daily_stats(logs):
+    """
+    Increments sent and failed counters of DailyDeliveryStat by the written Log records,
+    one update per mailing and day.
+    :param logs: saved Log instances
+    """
+    counters = {}
+    for log in logs:
+        key = (log.mailing_list_id, log.owner_id, timezone.localdate(log.time))
+        sent, failed = counters.get(key, (0, 0))
+        counters[key] = (sent + log.status, failed + (not log.status))
+    for (mailing_id, owner_id, day), (sent, failed) in counters.items():
+        stats = DailyDeliveryStat.objects.filter(mailing_list_id=mailing_id, day=day)
+        if stats.update(sent=F('sent') + sent, failed=F('failed') + failed):
+            continue
+        try:
+            with transaction.atomic():
+                DailyDeliveryStat.objects.create(mailing_list_id=mailing_id, owner_id=owner_id, day=day,
+                                                 sent=sent, failed=failed)
+        except IntegrityError:
+            # row of the day was created by another worker in the meantime
+            stats.update(sent=F('sent') + sent, failed=F('failed') + failed)
+
+
+def get_delivery_totals(owner=None):
+    """
+    Sums delivery counters from the daily rollup instead of counting Log rows.
+    :param owner: user instance, totals of all users if None
+    :returns: dict with all, success and error counters
+    """
+    stats = DailyDeliveryStat.objects.all()
+    if owner is not None:
+        stats = stats.filter(owner=owner)
+    totals = stats.aggregate(success=Sum('sent', default=0), error=Sum('failed', default=0))
+    totals['all'] = totals['success'] + totals['error']
+    return totals
+
+
+def build_message(mailing, recipient, template):
+    """
+    :param template: cached MIME template of the mailing message
+    :returns: PreparedMessage of the mailing addressed to one recipient
+    """
+    return PreparedMessage(mailing.message, settings.EMAIL_HOST_USER, recipient, template)
+
+
+def get_smtp_code(error):
+    """
+    :returns: SMTP reply code of the error, None if server has not answered
+    """
+    if isinstance(error, SMTPRecipientsRefused):
+        return max(code for code, response in error.recipients.values())
+    if isinstance(error, SMTPResponseException):
+        return error.smtp_code
+    return None
+
+
+def is_transient_error(error):
+    """
+    4xx replies, lost connections, timeouts and rate limiter timeouts are worth a retry,
+    5xx replies are permanent.
+    :returns: Boolean value
+    """
+    code = get_smtp_code(error)
+    if code is not None:
+        return 400 <= code < 500
+    return isinstance(error, (SMTPServerDisconnected, ThrottleTimeout, OSError))
+
+
+def get_retry_delay(attempt):
+    """
+    Exponential backoff with full jitter.
+    :param attempt: number of the failed attempt, starting from 1
+    :returns: seconds before the next attempt
+    """
+    delay = min(settings.MAILING_RETRY_MAX_DELAY, settings.MAILING_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    return random.uniform(delay / 2, delay)
+
+
+def handle_delivery_error(email, error):
+    """
+    Returns outbox email with a transient failure to pending state with backoff, it will be sent
+    by the retry queue. Permanent failure or failure after settings.MAILING_RETRY_MAX_ATTEMPTS attempts
+    is saved to the dead-letter store (FailedDelivery).
+    :param email: claimed outbox email instance
+    :param error: exception raised while sending
+    :returns: 1 if delivery has finally failed, else 0
+    """
+    if is_transient_error(error) and email.attempts < settings.MAILING_RETRY_MAX_ATTEMPTS:
+        email.state = OutboxEmail.PENDING
+        email.next_attempt_at = timezone.now() + timedelta(seconds=get_retry_delay(email.attempts))
+        email.save(update_fields=['state', 'next_attempt_at'])
+        return 0
+    email.state = OutboxEmail.FAILED
+    email.save(update_fields=['state'])
+    mailing = email.mailing_list
+    FailedDelivery.objects.create(
+        recipient=email.recipient,
+        attempts=email.attempts,
+        smtp_code=get_smtp_code(error),
+        server_response=str(error),
+        mailing_list_id=mailing.pk,
+        owner_id=mailing.owner_id
+    )
+    logger.error(f"Message with id: {mailing.message_id} to {email.recipient} moved to dead letters "
+                 f"after {email.attempts} attempts")
+    return 1
+
+
+def log_delivery(log_buffer, mailing, recipient, error):
+    """
+    Adds result of one delivery attempt to the log buffer.
+    :param error: exception raised while sending, None for delivered message
+    """
+    log_buffer.add(
+        time=mailing.start_time,
+        status=error is None,
+        server_response='OK' if error is None else str(error),
+        mailing_list_id=mailing.pk,
+        recipient=recipient,
+        owner_id=mailing.owner_id
+    )
+    if error is None:
+        logger.info(f"Message with id: {mailing.message_id} was successfully sent to {recipient}")
+    else:
+        logger.error(f"While sending message with id: {mailing.message_id} to {recipient} error occurred: {error}")
+
+
+def deliver_to_recipients(mailing, recipients):
+    """
+    Sends mailing message to every recipient over the shared SMTP connection. Result of each attempt
+    is buffered and written to Log in batches. With settings.MAILING_ASYNC_ENGINE recipients are sent
+    by the asyncio engine instead.
+    :param mailing: mailing settings instance
+    :param recipients: list of recipient emails
+    :returns: list of tuples (recipient, error), error is None for delivered message
+    """
+    if settings.MAILING_ASYNC_ENGINE:
+        return deliver_to_recipients_async(mailing, recipients)
+
+    results = []
+    connection = get_mail_connection()
+    template = get_message_template(mailing.message)
+    with LogBuffer() as log_buffer:
+        for client in recipients:
+            try:
+                deliver_message(connection, build_message(mailing, client, template))
+                error = None
+            except (SMTPException, OSError) as exception:
+                error = exception
+            except Exception as exception:
+                # e.g. an address smtplib can not encode, a permanent failure of this recipient only
+                logger.exception(f"Unexpected error while sending message to {client}")
+                error = exception
+            results.append((client, error))
+            log_delivery(log_buffer, mailing, client, error)
+    return results
+
+
+def deliver_to_recipients_async(mailing, recipients):
+    """
+    Sends mailing message to recipients over settings.MAILING_ASYNC_CONCURRENCY concurrent SMTP sessions.
+    Creates the same Log records as deliver_to_recipients.
+    :param mailing: mailing settings instance
+    :param recipients: list of recipient emails
+    :returns: list of tuples (recipient, error), error is None for delivered message
+    """
+    template = get_message_template(mailing.message)
+    messages = [build_message(mailing, client, template) for client in recipients]
+    concurrency = settings.MAILING_ASYNC_CONCURRENCY
+    if settings.MAILING_RATE_LIMIT_ENABLED:
+        # sessions above the relay connection cap would only wait for a free slot
+        relay_limits = RelayLimiter.get_limits(settings.MAILING_RELAY_LIMITS, settings.EMAIL_HOST) or {}
+        concurrency = min(concurrency, relay_limits.get('connections') or concurrency)
+    results = run_batch(messages, concurrency, deliver_message)
+    with LogBuffer() as log_buffer:
+        for client, error in results:
+            log_delivery(log_buffer, mailing, client, error)
+    return results
+
+
+def claim_outbox_emails(retries=False, limit=None, run=None):
+    """
+    Claims a batch of due pending outbox emails of started, active and not expired mailings
+    with SELECT ... FOR UPDATE SKIP LOCKED: rows locked
+    by other workers are skipped, so any number of workers take disjoint batches without coordination.
+    Claimed emails are moved to sending state and their attempts counter is incremented.
+    :param retries: claim emails which already had failed attempts instead of new ones
+    :param limit: batch size, settings.MAILING_CHUNK_SIZE by default
+    :param run: claim only emails of this mailing run
+    :returns: list of claimed outbox email instances
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = OutboxEmail.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+            state=OutboxEmail.PENDING, next_attempt_at__lte=now, mailing_list__is_active=True,
+            mailing_list__status=MailingSettings.STARTED, mailing_list__end_time__gte=now
+        )
+        emails = emails.filter(attempts__gt=0) if retries else emails.filter(attempts=0)
+        if run is not None:
+            emails = emails.filter(run=run)
+        ids = list(emails.order_by('next_attempt_at').values_list('pk', flat=True)[:limit or settings.MAILING_CHUNK_SIZE])
+        OutboxEmail.objects.filter(pk__in=ids).update(state=OutboxEmail.SENDING, claimed_at=now,
+                                                      attempts=F('attempts') + 1)
+    return list(OutboxEmail.objects.filter(pk__in=ids).select_related(
+        'mailing_list__message', 'mailing_list__owner', 'run'))
+
+
+def get_delivered_recipients(mailing, period, recipients):
+    """
+    Looks up recipients which have already received the mailing message in the period
+    by the unique (mailing, recipient, period) index of DeliveryState.
+    :param mailing: mailing settings instance
+    :param period: period of the mailing run
+    :param recipients: list of recipient emails
+    :returns: set of recipient emails
+    """
+    return set(DeliveryState.objects.filter(
+        mailing_list_id=mailing.pk, period=period, recipient__in=recipients, state=DeliveryState.SENT
+    ).values_list('recipient', flat=True))
+
+
+def save_delivery_states(mailing, period, emails, errors):
+    """
+    Upserts delivery state of every sent outbox email, so only the latest attempt of the recipient
+    in the period is kept.
+    :param mailing: mailing settings instance
+    :param period: period of the mailing run
+    :param emails: list of outbox email instances with their new state
+    :param errors: dict recipient -> exception, None for delivered message
+    """
+    states = {
+        OutboxEmail.SENT: DeliveryState.SENT,
+        OutboxEmail.PENDING: DeliveryState.PENDING,
+        OutboxEmail.FAILED: DeliveryState.FAILED,
+    }
+    DeliveryState.objects.bulk_create(
+        [
+            DeliveryState(
+                mailing_list_id=mailing.pk,
+                recipient=email.recipient,
+                period=period,
+                state=states[email.state],
+                attempts=email.attempts,
+                server_response='OK' if errors[email.recipient] is None else str(errors[email.recipient]),
+            )
+            for email in emails
+        ],
+        update_conflicts=True,
+        unique_fields=['mailing_list', 'recipient', 'period'],
+        update_fields=['state', 'attempts', 'server_response', 'updated_at'],
+    )
+
+
+def send_run_emails(run, emails):
+    """
+    Sends claimed outbox emails of one run and saves their new state: sent, pending with backoff
+    for transient failures or failed. Recipients which already received the message in the period
+    of the run are not sent again. Delivered emails are saved right after sending, before failures
+    are handled, so an error in the rest of the batch never makes them be sent twice.
+    :param run: mailing run instance
+    :param emails: list of claimed outbox email instances of the run
+    """
+    mailing = emails[0].mailing_list
+    if mailing.message_id is None:
+        raise ValueError(f"Mailing with id {mailing.pk} has no message")
+    delivered = get_delivered_recipients(mailing, run.period, [email.recipient for email in emails])
+    if delivered:
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in emails if email.recipient in delivered]
+                                   ).update(state=OutboxEmail.SENT)
+        logger.info(f"{len(delivered)} recipients of mailing with id {mailing.pk} have already received "
+                    f"the message in this period")
+    emails = [email for email in emails if email.recipient not in delivered]
+    errors = dict(deliver_to_recipients(mailing, [email.recipient for email in emails]))
+    sent_emails = [email for email in emails if errors[email.recipient] is None]
+    failed_emails = [email for email in emails if errors[email.recipient] is not None]
+    with transaction.atomic():
+        for email in sent_emails:
+            email.state = OutboxEmail.SENT
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in sent_emails]).update(state=OutboxEmail.SENT)
+        save_delivery_states(mailing, run.period, sent_emails, errors)
+        MailingRun.objects.filter(pk=run.pk).update(sent=F('sent') + len(sent_emails))
+    failed = sum(handle_delivery_error(email, errors[email.recipient]) for email in failed_emails)
+    save_delivery_states(mailing, run.period, failed_emails, errors)
+    MailingRun.objects.filter(pk=run.pk).update(failed=F('failed') + failed)
+
+
+def fail_unsent_emails(run, emails, error):
+    """
+    Hands emails of the run which are still in sending state to handle_delivery_error after
+    an unexpected error, so they are retried or moved to dead letters instead of staying claimed.
+    :param run: mailing run instance
+    :param emails: list of claimed outbox email instances of the run
+    :param error: exception raised while sending the run's emails
+    """
+    unsent_ids = set(OutboxEmail.objects.filter(
+        pk__in=[email.pk for email in emails], state=OutboxEmail.SENDING
+    ).values_list('pk', flat=True))
+    failed = sum(handle_delivery_error(email, error) for email in emails if email.pk in unsent_ids)
+    MailingRun.objects.filter(pk=run.pk).update(failed=F('failed') + failed)
+
+
+def send_outbox_emails(emails):
+    """
+    Sends claimed outbox emails run by run. An error in one run does not stop other runs of the batch:
+    its unsent emails are handled as failed. Finishes drained runs.
+    :param emails: list of claimed outbox email instances
+    """
+    by_run = {}
+    for email in emails:
+        by_run.setdefault(email.run_id, []).append(email)
+    for run_id, run_emails in by_run.items():
+        run = run_emails[0].run
+        try:
+            send_run_emails(run, run_emails)
+        except Exception as error:
+            logger.exception(f"While sending outbox emails of run {run_id} error occurred: {error}")
+            fail_unsent_emails(run, run_emails, error)
+        run.finish_if_drained()
+
+
+def drain_outbox(retries=False, run=None):
+    """
+    Claims and sends batches of outbox emails until no due email is left.
+    :param retries: send emails which already had failed attempts instead of new ones
+    :param run: drain only emails of this mailing run
+    :returns: number of processed emails
+    """
+    processed = 0
+    while True:
+        emails = claim_outbox_emails(retries, run=run)
+        if not emails:
+            return processed
+        send_outbox_emails(emails)
+        processed += len(emails)
+
+
+def iter_recipients(mailing, after=None, until=None):
+    """
+    Streams distinct normalized (trimmed, lower case) emails of mailing clients straight from the database
+    with a server-side cursor, ordered by email. Only email values are loaded, not Client instances.
+    :param mailing: mailing settings instance
+    :param after: stream emails greater than this one
+    :param until: stream emails up to this one inclusive
+    :returns: generator of emails
+    """
+    emails = Client.objects.filter(all_clients=mailing).annotate(
+        normalized_email=Lower(Trim('email'))
+    ).exclude(normalized_email='')
+    if after is not None:
+        emails = emails.filter(normalized_email__gt=after)
+    if until is not None:
+        emails = emails.filter(normalized_email__lte=until)
+    return emails.values_list('normalized_email', flat=True).distinct().order_by(
+        'normalized_email').iterator(chunk_size=settings.MAILING_CHUNK_SIZE)
+
+
+def iter_recipient_chunks(mailing, chunk_size, after=None):
+    """
+    :param after: start after this email
+    :returns: generator of recipient lists with chunk_size emails at most
+    """
+    chunk = []
+    for email in iter_recipients(mailing, after):
+        chunk.append(email)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def materialize_run(run):
+    """
+    Writes distinct recipients of the run's mailing to the outbox in chunks of settings.MAILING_CHUNK_SIZE.
+    Run is checkpointed after every chunk, so an interrupted run continues from the last written recipient,
+    already written recipients are ignored by the unique (run, recipient) constraint.
+    :param run: mailing run instance
+    """
+    mailing = run.mailing_list
+    for recipients in iter_recipient_chunks(mailing, settings.MAILING_CHUNK_SIZE, run.cursor):
+        OutboxEmail.objects.bulk_create(
+            [OutboxEmail(recipient=recipient, mailing_list_id=mailing.pk, run_id=run.pk) for recipient in recipients],
+            ignore_conflicts=True
+        )
+        run.checkpoint(recipients[-1])
+    run.materialized = True
+    run.save(update_fields=['materialized', 'checkpoint_at'])
+
+
+def start_run(run):
+    """
+    Materializes the run and sends its outbox. With settings.MAILING_FANOUT the outbox is drained by
+    settings.MAILING_OUTBOX_DRAINERS parallel celery tasks, otherwise the current task sends emails
+    of this run only, so the mailing lease held by the caller is not kept for other mailings.
+    Run of a mailing without a message is interrupted before any recipient is written to the outbox.
+    :param run: mailing run instance
+    """
+    if run.mailing_list.message_id is None:
+        logger.error(f"Run {run.pk} of mailing with id {run.mailing_list_id} was interrupted: mailing has no message")
+        run.finish(MailingRun.INTERRUPTED)
+        return
+    materialize_run(run)
+    if settings.MAILING_FANOUT:
+        from distribution.tasks import send_outbox
+        for _ in range(settings.MAILING_OUTBOX_DRAINERS):
+            send_outbox.delay()
+    else:
+        drain_outbox(run=run)
+    run.finish_if_drained()
+
+
+def resume_interrupted_runs():
+    """
+    Recovers work of crashed or restarted workers:
+    outbox emails claimed more than settings.MAILING_RUN_STALE_SECONDS ago are returned to pending state
+    or, if they have used all settings.MAILING_RETRY_MAX_ATTEMPTS attempts, moved to dead letters,
+    runs which recipients were not fully written to the outbox and were not checkpointed for that time
+    are continued from their cursor. Runs of finished or stopped mailings are marked interrupted.
+    Run is resumed under the mailing lease, so a run still held by a live worker is skipped.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.MAILING_RUN_STALE_SECONDS)
+    stale_emails = OutboxEmail.objects.filter(state=OutboxEmail.SENDING, claimed_at__lt=stale)
+    exhausted = stale_emails.filter(attempts__gte=settings.MAILING_RETRY_MAX_ATTEMPTS).select_related('mailing_list')
+    for email in exhausted:
+        handle_delivery_error(email, RuntimeError("Worker was interrupted while sending the message"))
+        MailingRun.objects.filter(pk=email.run_id).update(failed=F('failed') + 1)
+    released = stale_emails.update(state=OutboxEmail.PENDING)
+    if released:
+        logger.warning(f"{released} outbox emails of interrupted workers were returned to pending state")
+    stale_runs = MailingRun.objects.filter(
+        status=MailingRun.RUNNING, materialized=False, checkpoint_at__lt=stale
+    ).select_related('mailing_list__message', 'mailing_list__owner')
+    for run in stale_runs:
+        mailing = run.mailing_list
+        with Lease(f'mailing:{mailing.pk}') as lease:
+            if not lease.acquired:
+                continue
+            run.refresh_from_db()
+            if run.status != MailingRun.RUNNING or run.materialized:
+                continue
+            if mailing.is_active and mailing.status == MailingSettings.STARTED and mailing.end_time >= now:
+                logger.warning(f"Run {run.pk} of mailing with id {mailing.pk} is resumed after {run.cursor}")
+                start_run(run)
+            else:
+                run.finish(MailingRun.INTERRUPTED)
+
+
+def interrupt_mailing_runs(mailing_ids):
+    """
+    Interrupts running runs of mailings which were stopped, disabled or completed. Their pending
+    outbox emails are dropped as failed, so a re-enabled mailing never sends the old period together
+    with the new one, and purge_outbox removes the rows of the interrupted runs later.
+    :param mailing_ids: ids of mailing settings
+    :returns: number of interrupted runs
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        run_ids = list(MailingRun.objects.select_for_update().filter(
+            mailing_list_id__in=mailing_ids, status=MailingRun.RUNNING
+        ).values_list('pk', flat=True))
+        if not run_ids:
+            return 0
+        dropped = OutboxEmail.objects.filter(run_id__in=run_ids, state=OutboxEmail.PENDING).update(
+            state=OutboxEmail.FAILED)
+        MailingRun.objects.filter(pk__in=run_ids).update(status=MailingRun.INTERRUPTED, finished_at=now)
+    logger.info(f"{len(run_ids)} runs of stopped mailings were interrupted, {dropped} pending emails dropped")
+    return len(run_ids)
+
+
+def complete_expired_mailings():
+    """
+    Sets COMPLETED status to all mailings which end time has passed with one bulk UPDATE
+    through mailing_expiry_idx. Their running runs are interrupted, cached dashboards of their owners
+    are invalidated.
+    :returns: number of completed mailings
+    """
+    expired = MailingSettings.objects.filter(end_time__lt=timezone.now()).exclude(status=MailingSettings.COMPLETED)
+    with transaction.atomic():
+        expired_ids = dict(expired.values_list('pk', 'owner_id'))
+        completed = MailingSettings.objects.filter(pk__in=expired_ids).update(status=MailingSettings.COMPLETED)
+    owner_ids = set(expired_ids.values())
+    if completed:
+        interrupt_mailing_runs(list(expired_ids))
+        # update() sends no post_save signals
+        bump_dashboard_version(*owner_ids)
+        logger.info(f"{completed} expired mailings were completed")
+    return completed
+
 
 def send_mailing(mailing):
     """
     Checks if current date is between start and end dates of mailing settings.
-    If true - send message and create log instance after it.
+    If true - move mailing to the next period and start a new mailing run: every distinct client email
+    is written to the outbox, then the outbox is sent and log instance is created after every attempt.
     If false - set mailing setting status on .COMPLETED.
     :param mailing: mailing settings instance
     """
     now = timezone.localtime(timezone.now())
     if mailing.start_time <= now <= mailing.end_time:
-        client_list = []
-
-        for client in mailing.clients.all():
-            client_list.append(client.email)
-        for client in client_list:
-            try:
-                result = send_mail(
-                    subject=mailing.message.title,
-                    message=mailing.message.text,
-                    from_email=settings.EMAIL_HOST_USER,
-                    recipient_list=[client],
-                    fail_silently=False
-                )
-                log = Log.objects.create(
-                    time=mailing.start_time,
-                    status=result,
-                    server_response='OK',
-                    mailing_list=mailing,
-                    recipient=client,
-                    owner=mailing.owner
-                )
-                log.save()
-                logger.info(f"Message with id: {mailing.message.pk} was successfully sent to {client}")
-            except SMTPException as error:
-                log = Log.objects.create(
-                    time=mailing.start_time,
-                    status=False,
-                    server_response=str(error),
-                    mailing_list=mailing,
-                    recipient=client,
-                    owner = mailing.owner
-                )
-                log.save()
-                logger.error(f"While sending message with id: {mailing.message.pk} to {client} error occurred: {error}")
+        if mailing.message_id is None:
+            # period is skipped, so the mailing is not picked again every minute
+            mailing.mark_sent(now)
+            logger.error(f"Mailing with id {mailing.pk} has no message, the period was skipped")
+            return
+        period = mailing.next_send_at or now
+        mailing.mark_sent(now)
+        run = MailingRun.objects.create(mailing_list=mailing, period=period)
+        start_run(run)
 
     else:
         mailing.status = MailingSettings.COMPLETED
@@ -0,0 +1,61 @@
+import logging
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from distribution.dashboard import bump_dashboard_version
+from distribution.models import Message, MailingSettings, Client
+from distribution.payloads import invalidate_message_template
+from distribution.services import interrupt_mailing_runs
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Message)
+def message_saved(sender, instance, created, **kwargs):
+    """
+    Drops cached MIME template of the previous message version after the message was edited.
+    :param instance: saved message
+    :param created: True for a new message
+    """
+    if not created:
+        invalidate_message_template(instance.pk, instance.version - 1)
+
+
+@receiver(post_save, sender=MailingSettings)
+@receiver(post_delete, sender=MailingSettings)
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def dashboard_data_changed(sender, instance, **kwargs):
+    """
+    Invalidates cached dashboards of the owner after a mailing or client was changed.
+    Logs have no receivers: delivery counters come from DailyDeliveryStat updated by LogBuffer,
+    which bumps the version itself, and a delete receiver would disable fast deletes of old logs.
+    """
+    bump_dashboard_version(instance.owner_id)
+
+
+@receiver(m2m_changed, sender=MailingSettings.clients.through)
+def mailing_clients_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalidates cached dashboards after clients of a mailing were changed.
+    :param instance: mailing settings, or client if the relation was changed from the client side
+    """
+    if not action.startswith('post_'):
+        return
+    owner_ids = [instance.owner_id]
+    if reverse and pk_set:
+        owner_ids += MailingSettings.objects.filter(pk__in=pk_set).values_list('owner_id', flat=True)
+    bump_dashboard_version(*owner_ids)
+
+
+@receiver(post_save, sender=MailingSettings)
+def mailing_settings_saved(sender, instance, created, **kwargs):
+    """
+    Interrupts running runs of a mailing which was disabled, completed or moved out of started status
+    by the disable action, the edit form or admin.
+    :param instance: saved mailing settings
+    :param created: True for a new mailing
+    """
+    if created or (instance.is_active and instance.status == MailingSettings.STARTED):
+        return
+    interrupt_mailing_runs([instance.pk])
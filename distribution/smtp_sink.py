@@ -0,0 +1,92 @@
+import socketserver
+import threading
+import time
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """
+    Minimal SMTP dialogue: accepts every envelope and drops message data.
+    """
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        if self.server.greeting_delay:
+            time.sleep(self.server.greeting_delay)
+        self.reply('220 localhost SMTP sink ready')
+        in_data = False
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            if in_data:
+                if line in (b'.\r\n', b'.\n'):
+                    in_data = False
+                    if self.server.message_delay:
+                        time.sleep(self.server.message_delay)
+                    self.server.count_message()
+                    self.reply('250 OK queued')
+                continue
+            command = line[:4].upper()
+            if command == b'EHLO':
+                self.reply('250-localhost')
+                self.reply('250 8BITMIME')
+            elif command == b'RCPT':
+                address = line.decode().split(':', 1)[-1].strip().strip('<>').lower()
+                self.reply(self.server.rcpt_replies.get(address, '250 OK'))
+            elif command in (b'HELO', b'MAIL', b'RSET', b'NOOP'):
+                self.reply('250 OK')
+            elif command == b'DATA':
+                in_data = True
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+            elif command == b'QUIT':
+                self.reply('221 Bye')
+                break
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    Local stand-in SMTP server for benchmarks. Counts received messages and connections.
+    greeting_delay simulates TCP+TLS+AUTH handshake cost of a real relay,
+    message_delay simulates time the relay takes to accept one message,
+    rcpt_replies maps recipient email to a custom RCPT reply, e.g. '451 Try again later'.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, greeting_delay=0.0, message_delay=0.0, rcpt_replies=None):
+        super().__init__((host, port), SMTPSinkHandler)
+        self.rcpt_replies = rcpt_replies or {}
+        self.greeting_delay = greeting_delay
+        self.message_delay = message_delay
+        self.received = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def count_message(self):
+        with self._lock:
+            self.received += 1
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def start(self):
+        """
+        Serves in a background daemon thread.
+        :returns: self
+        """
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
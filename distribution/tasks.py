@@ -1,14 +1,29 @@
 from django.core.exceptions import ObjectDoesNotExist
-from distribution.services import send_mailing
+from distribution.async_delivery import close_connection_pool
+from distribution.locks import Lease
+from distribution.retention import archive_logs, purge_outbox, prune_delivery_states
+from distribution.services import send_mailing, close_mail_connection, drain_outbox, resume_interrupted_runs, \
+    complete_expired_mailings, interrupt_mailing_runs
 from celery import shared_task
+from celery.signals import worker_process_shutdown
 import logging
 from celery import Celery
+from django.utils import timezone
 
 from users.models import User
 
 logger = logging.getLogger(__name__)
 
 
+@worker_process_shutdown.connect
+def close_worker_mail_connection(**kwargs):
+    """
+    Closes SMTP connections kept open by the worker process.
+    """
+    close_mail_connection()
+    close_connection_pool()
+
+
 @shared_task(bind=True, retry_backoff=True, retry_kwargs={'max_retries': 5})
 def start_distribution_task(self, user_id):
     """
@@ -30,14 +45,17 @@ def start_distribution_task(self, user_id):
 @shared_task(bind=True, retry_backoff=True, retry_kwargs={'max_retries': 5})
 def stop_distribution_task(self, user_id):
     """
-    Filter mailing settings, set them is_active=False and stops all celery mailing tasks for current user
+    Filter mailing settings, set them is_active=False and stops all celery mailing tasks for current user.
+    Running runs of the mailings are interrupted.
     :param user_id: user_id of current user authorised
     """
     logger.info('stop_distribution_task started')
     from distribution.models import MailingSettings
     try:
         user = User.objects.get(pk=user_id)
-        MailingSettings.objects.filter(owner=user).update(is_active=False)
+        mailings = MailingSettings.objects.filter(owner=user)
+        mailings.update(is_active=False)
+        interrupt_mailing_runs(list(mailings.values_list('pk', flat=True)))
         logger.info(f'MailingSettings of user {user.username} updated successfully (stop mailings)')
     except ObjectDoesNotExist:
         logger.error(f"User with ID {user_id} was not found.")
@@ -45,49 +63,112 @@ def stop_distribution_task(self, user_id):
         logger.error(f'Error in stop_distribution_task occurred: {e}')
 
 
+def send_due_mailings(periodicity=None):
+    """
+    Sends started and active mailings which next_send_at has come. Rows are picked by the mailing_due_idx
+    index, so cost of a run depends on the number of due mailings, not on the size of the table.
+    Every mailing is sent under a Redis lease, so overlapping runs of this task on different workers
+    never send the same mailing twice in one period.
+    :param periodicity: optional periodicity filter
+    """
+    from distribution.models import MailingSettings
+    mailings = MailingSettings.objects.filter(
+        status=MailingSettings.STARTED, is_active=True, next_send_at__lte=timezone.now()
+    ).select_related('message', 'owner')
+    if periodicity:
+        mailings = mailings.filter(periodicity=periodicity)
+    for mailing in mailings:
+        with Lease(f'mailing:{mailing.pk}') as lease:
+            if not lease.acquired:
+                continue
+            # another worker could have sent it between the query and the lease
+            mailing.refresh_from_db(fields=['next_send_at', 'last_sent_at', 'status', 'is_active'])
+            if not mailing.is_active or mailing.next_send_at > timezone.now():
+                logger.info(f"Mailing with id {mailing.pk} was already sent in this period")
+                continue
+            try:
+                send_mailing(mailing)
+            except Exception as e:
+                logger.error(f"While sending messages error occurred: {e}")
+
+
+@shared_task(bind=True)
+def dispatch_due_mailings(self):
+    """
+    Celery task. Sends all mailings which are due, regardless of periodicity.
+    """
+    logger.info("dispatch due mailings task is running")
+    resume_interrupted_runs()
+    send_due_mailings()
+
+
 @shared_task(bind=True)
 def daily_tasks(self):
     """
-    Celery task. Filter mailing settings with periodicity="Раз в день" and starts sending messages
+    Celery task. Sends due mailing settings with periodicity="Раз в день"
     """
     logger.info("daily task is running!!")
-    from distribution.models import MailingSettings
-    try:
-        mailings = MailingSettings.objects.filter(periodicity="Раз в день", status="Запущена", is_active=True)
-        if mailings.exists():
-            for mailing in mailings:
-                send_mailing(mailing)
-    except Exception as e:
-        logger.error(f"While sending messages error occurred: {e}")
+    send_due_mailings("Раз в день")
 
 
 @shared_task(bind=True)
 def weekly_tasks(self):
     """
-    Celery task. Filter mailing settings with periodicity="Раз в неделю" and starts sending messages
+    Celery task. Sends due mailing settings with periodicity="Раз в неделю"
     """
     logger.info("weekly task is running!!")
-    from distribution.models import MailingSettings
-    mailings = MailingSettings.objects.filter(periodicity="Раз в неделю", status="Запущена", is_active=True)
-    if mailings.exists():
-        for mailing in mailings:
-            try:
-                send_mailing(mailing)
-            except Exception as e:
-                logger.error(f"While sending messages error occurred: {e}")
+    send_due_mailings("Раз в неделю")
 
 
 @shared_task(bind=True)
 def monthly_tasks(self):
     """
-    Celery task. Filter mailing settings with periodicity="Раз в месяц" and starts sending messages
+    Celery task. Sends due mailing settings with periodicity="Раз в месяц"
     """
     logger.info("monthly task is running!!")
-    from distribution.models import MailingSettings
-    mailings = MailingSettings.objects.filter(periodicity="Раз в месяц", status="Запущена", is_active=True)
-    if mailings.exists():
-        for mailing in mailings:
-            try:
-                send_mailing(mailing)
-            except Exception as e:
-                logger.error(f"While sending messages error occurred: {e}")
+    send_due_mailings("Раз в месяц")
+
+
+@shared_task(bind=True)
+def send_outbox(self):
+    """
+    Celery task. Claims and sends new outbox emails until the outbox is drained.
+    Any number of these tasks may run at once, each claims its own batches.
+    """
+    processed = drain_outbox()
+    if processed:
+        logger.info(f"{processed} outbox emails were processed")
+
+
+@shared_task(bind=True)
+def send_outbox_retries(self):
+    """
+    Celery task of the retry queue. Sends outbox emails which failed with a transient error
+    and whose backoff has passed.
+    """
+    processed = drain_outbox(retries=True)
+    if processed:
+        logger.info(f"{processed} outbox emails were retried")
+
+
+@shared_task(bind=True)
+def archive_old_logs(self):
+    """
+    Celery task. Archives and deletes Log records older than settings.LOG_RETENTION_DAYS
+    and outbox emails of runs finished more than settings.OUTBOX_RETENTION_DAYS ago,
+    prunes delivery states of past periods.
+    Runs under a Redis lease, so two workers never archive the same rows at once.
+    """
+    with Lease('log-retention') as lease:
+        if lease.acquired:
+            archive_logs()
+            purge_outbox()
+            prune_delivery_states()
+
+
+@shared_task(bind=True)
+def sweep_expired_mailings(self):
+    """
+    Celery task. Completes mailings which end time has passed.
+    """
+    complete_expired_mailings()
@@ -0,0 +1,176 @@
+import logging
+import time
+import uuid
+from smtplib import SMTPException
+
+from django.conf import settings
+
+from distribution.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Takes one token from every bucket in KEYS or none of them.
+# ARGV: rate_1, burst_1, rate_2, burst_2, ... Returns seconds to wait as a string, '0' when tokens were taken.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local wait = 0
+local buckets = {}
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2 - 1])
+    local burst = tonumber(ARGV[i * 2])
+    local data = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(data[1]) or burst
+    local ts = tonumber(data[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+    buckets[i] = {key, tokens, rate, burst}
+end
+for _, bucket in ipairs(buckets) do
+    local tokens = bucket[2]
+    if wait == 0 then
+        tokens = tokens - 1
+    end
+    redis.call('HSET', bucket[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('PEXPIRE', bucket[1], math.ceil(bucket[4] / bucket[3] * 1000) + 1000)
+end
+return tostring(wait)
+"""
+
+# Acquires or refreshes a connection slot. KEYS[1] - sorted set of slot holders scored by lease expiry.
+# ARGV: limit, holder token, lease ttl in ms. Returns 1 when the holder owns a slot.
+SEMAPHORE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local ttl = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZSCORE', KEYS[1], ARGV[2]) or redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[1]) then
+    redis.call('ZADD', KEYS[1], now + ttl, ARGV[2])
+    redis.call('PEXPIRE', KEYS[1], ttl)
+    return 1
+end
+return 0
+"""
+
+
+class ThrottleTimeout(SMTPException):
+    """
+    Rate limiter could not grant sending within settings.MAILING_RATE_LIMIT_TIMEOUT.
+    """
+
+
+class RelayLimiter:
+    """
+    Cluster-wide limiter shared by all celery workers through Redis.
+    Token buckets limit messages per second of the relay and of the sender,
+    a semaphore with expiring leases limits concurrent connections to the relay.
+    """
+
+    def __init__(self, relay, sender):
+        self.relay = relay or 'default'
+        self.sender = sender or 'default'
+        self.relay_limits = self.get_limits(settings.MAILING_RELAY_LIMITS, self.relay)
+        self.sender_limits = self.get_limits(settings.MAILING_SENDER_LIMITS, self.sender)
+        self.redis = get_redis()
+
+    @staticmethod
+    def get_limits(limits, key):
+        """
+        :returns: limits configured for the key or 'default' limits, None if unlimited
+        """
+        return limits.get(key, limits.get('default'))
+
+    def take_token(self):
+        """
+        Takes one token from relay and sender buckets.
+        :returns: seconds to wait before the next try, 0 if token was taken
+        """
+        keys = []
+        args = []
+        for name, limits in ((f'relay:{self.relay}', self.relay_limits), (f'sender:{self.sender}', self.sender_limits)):
+            if limits and limits.get('rate'):
+                keys.append(f'mailing:throttle:bucket:{name}')
+                args.extend([limits['rate'], limits.get('burst', limits['rate'])])
+        if not keys:
+            return 0
+        return float(self.redis.eval(TOKEN_BUCKET_SCRIPT, len(keys), *keys, *args))
+
+    def acquire_slot(self, token):
+        """
+        Acquires connection slot for the token or refreshes its lease.
+        :returns: True if token holds a slot
+        """
+        if not self.relay_limits or not self.relay_limits.get('connections'):
+            return True
+        ttl = int(self.relay_limits.get('slot_ttl', 60) * 1000)
+        key = f'mailing:throttle:slots:{self.relay}'
+        return bool(self.redis.eval(SEMAPHORE_SCRIPT, 1, key, self.relay_limits['connections'], token, ttl))
+
+    def release_slot(self, token):
+        self.redis.zrem(f'mailing:throttle:slots:{self.relay}', token)
+
+    def record_wait(self, seconds):
+        """
+        Adds wait time to the relay metrics hash: wait_seconds_total and acquisitions.
+        """
+        key = f'mailing:throttle:metrics:{self.relay}'
+        pipe = self.redis.pipeline()
+        pipe.hincrbyfloat(key, 'wait_seconds_total', seconds)
+        pipe.hincrby(key, 'acquisitions', 1)
+        pipe.execute()
+        if seconds >= 1:
+            logger.warning(f"Waited {seconds:.2f}s for relay {self.relay} rate limit")
+
+
+def throttle(connection, sender):
+    """
+    Blocks until the connection holds a relay connection slot and a send token is taken.
+    Called before every message by all delivery paths.
+    :param connection: email backend instance
+    :param sender: from email of the message
+    :raises ThrottleTimeout: if limits were not granted in settings.MAILING_RATE_LIMIT_TIMEOUT seconds
+    """
+    if not settings.MAILING_RATE_LIMIT_ENABLED:
+        return
+    limiter = RelayLimiter(getattr(connection, 'host', None), sender)
+    started = time.monotonic()
+    deadline = started + settings.MAILING_RATE_LIMIT_TIMEOUT
+    token = getattr(connection, 'relay_slot', None) or uuid.uuid4().hex
+    while not limiter.acquire_slot(token):
+        if time.monotonic() > deadline:
+            raise ThrottleTimeout(f"No free connection slot for relay {limiter.relay}")
+        time.sleep(0.1)
+    connection.relay_slot = token
+    wait = limiter.take_token()
+    while wait:
+        if time.monotonic() + wait > deadline:
+            raise ThrottleTimeout(f"Rate limit of relay {limiter.relay} was not granted in time")
+        time.sleep(wait)
+        wait = limiter.take_token()
+    limiter.record_wait(time.monotonic() - started)
+
+
+def release_connection_slot(connection):
+    """
+    Frees relay connection slot held by the connection, if any.
+    """
+    token = getattr(connection, 'relay_slot', None)
+    if token and settings.MAILING_RATE_LIMIT_ENABLED:
+        RelayLimiter(getattr(connection, 'host', None), None).release_slot(token)
+    connection.relay_slot = None
+
+
+def get_wait_metrics(relay):
+    """
+    :returns: dict with wait_seconds_total, acquisitions and average wait of the relay
+    """
+    data = get_redis().hgetall(f'mailing:throttle:metrics:{relay}')
+    wait_total = float(data.get(b'wait_seconds_total', 0))
+    acquisitions = int(data.get(b'acquisitions', 0))
+    return {
+        'wait_seconds_total': wait_total,
+        'acquisitions': acquisitions,
+        'average_wait': wait_total / acquisitions if acquisitions else 0,
+    }
@@ -3,7 +3,8 @@ from distribution.apps import DistributionConfig
 from distribution.views import ClientListView, ClientCreateView, ClientUpdateView, ClientDeleteView, MessageListView, \
     MessageCreateView, MessageUpdateView, MessageDeleteView, MailingSettingsListView, MailingSettingsCreateView, \
     MailingSettingsUpdateView, MailingSettingsDeleteView, MailingSettingsDetailView, LogListView, MessageDetailView, \
-    ClientDetailView
+    ClientDetailView, LogExportView, ClientExportView, \
+    ClientImportView
 
 app_name = DistributionConfig.name
 
@@ -23,5 +24,8 @@ urlpatterns = [
     path('distribution/create', MailingSettingsCreateView.as_view(), name='create_distribution'),
     path('distribution/edit/<int:pk>/', MailingSettingsUpdateView.as_view(), name='update_distribution'),
     path('distribution/delete/<int:pk>/', MailingSettingsDeleteView.as_view(), name='delete_distribution'),
-    path('log', LogListView.as_view(), name='log_list')
+    path('log', LogListView.as_view(), name='log_list'),
+    path('log/export', LogExportView.as_view(), name='log_export'),
+    path('clients/export', ClientExportView.as_view(), name='client_export'),
+    path('clients/import', ClientImportView.as_view(), name='client_import'),
 ]
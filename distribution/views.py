@@ -1,9 +1,9 @@
+import io
 import logging
 
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
-from django.core.cache import cache
-from django.db.models import Case, When, IntegerField
+from django.http import StreamingHttpResponse, HttpResponseBadRequest
 from django.shortcuts import render, redirect
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
@@ -11,15 +11,22 @@ from django.views.decorators.cache import cache_page
 from celery_app import app
 from django.urls import reverse
 from django.utils import timezone
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
-from distribution.forms import MessageForm, MailingSettingsForm, ClientForm
+from django.utils.dateparse import parse_date
+from django.views import View
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, FormView
+from distribution.dashboard import get_dashboard
+from distribution.exports import CONTENT_TYPES, get_export_queryset, iter_export
+from distribution.forms import MessageForm, MailingSettingsForm, ClientForm, ClientImportForm
+from distribution.imports import ClientImportError, import_clients, iter_import_rows
 from distribution.models import Client, Message, MailingSettings, Log
+from distribution.pagination import OwnerFirstKeysetPaginationMixin, TimeKeysetPaginationMixin
+from distribution.services import get_delivery_totals
 from distribution.tasks import start_distribution_task, stop_distribution_task
 
 logger = logging.getLogger(__name__)
 
 
-class ClientListView(LoginRequiredMixin, ListView):
+class ClientListView(LoginRequiredMixin, OwnerFirstKeysetPaginationMixin, ListView):
     """
     CBV to display all clients.
     """
@@ -27,20 +34,12 @@ class ClientListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         """
-        Order such to display clients of the current user at first, then others.
+        Clients of the current user are shown at first, then others (see OwnerFirstKeysetPaginationMixin).
         If user hasn't permission 'distribution.can_see_all_clients' filters queryset.
-        :returns: Ordered and filtered queryset
+        :returns: Filtered queryset
         """
         queryset = super().get_queryset()
 
-        queryset = queryset.order_by(
-            Case(
-                When(owner=self.request.user, then=1),
-                default=2,
-                output_field=IntegerField(),
-            )
-        )
-
         if self.request.user.has_perm('distribution.can_see_all_clients'):
             return queryset
         else:
@@ -57,6 +56,43 @@ class ClientListView(LoginRequiredMixin, ListView):
         return context_data
 
 
+class ClientImportView(LoginRequiredMixin, FormView):
+    """
+    CBV to import clients of the current user from a CSV or JSONL file in bulk.
+    """
+    form_class = ClientImportForm
+    template_name = 'distribution/client_import.html'
+
+    def get_form_kwargs(self):
+        """
+        Set to kwargs['user'] current user to get it in ClientImportForm to filter mailings.
+        """
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
+    def form_valid(self, form):
+        """
+        Streams the uploaded file into import_clients and shows the import report.
+        :returns: redirect to clients page
+        """
+        file = io.TextIOWrapper(form.cleaned_data['file'], encoding='utf-8-sig', newline='')
+        try:
+            result = import_clients(iter_import_rows(file, form.cleaned_data['format']), self.request.user,
+                                    form.cleaned_data['mailing'])
+        except ClientImportError as e:
+            logger.error(f"User {self.request.user.pk} import of clients was stopped: {e}, saved: {e.result}")
+            form.add_error('file', f"Импорт прерван: {e}. Сохранено строк: {e.result['rows']}, "
+                                   f"добавлено клиентов: {e.result['created']}")
+            return self.form_invalid(form)
+        logger.info(f"User {self.request.user.pk} imported clients: {result}")
+        messages.info(self.request,
+                      f"Обработано строк: {result['rows']}, добавлено клиентов: {result['created']}, "
+                      f"дубликатов: {result['duplicates']}, ошибок: {result['invalid']}, "
+                      f"добавлено в рассылку: {result['attached']}")
+        return redirect(reverse('distribution:client_list'))
+
+
 @method_decorator(cache_page(60 * 3), name='dispatch')
 class ClientDetailView(LoginRequiredMixin, DetailView):
     """
@@ -111,7 +147,7 @@ class ClientDeleteView(DeleteView):
         return reverse('distribution:client_list')
 
 
-class MessageListView(LoginRequiredMixin, ListView):
+class MessageListView(LoginRequiredMixin, OwnerFirstKeysetPaginationMixin, ListView):
     """
     CBV to display messages.
     """
@@ -119,20 +155,12 @@ class MessageListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         """
-        Order such to display messages of the current user at first, then others.
+        Messages of the current user are shown at first, then others (see OwnerFirstKeysetPaginationMixin).
         If user hasn't permission 'distribution.can_see_all_messages' filters queryset.
-        :returns: Ordered and filtered queryset
+        :returns: Filtered queryset
         """
         queryset = super().get_queryset()
 
-        queryset = queryset.order_by(
-            Case(
-                When(owner=self.request.user, then=1),
-                default=2,
-                output_field=IntegerField(),
-            )
-        )
-
         if self.request.user.has_perm('distribution.can_see_all_messages'):
             return queryset
         return queryset.filter(owner=self.request.user)
@@ -204,7 +232,7 @@ class MessageDeleteView(DeleteView):
         return reverse('distribution:message_list')
 
 
-class MailingSettingsListView(LoginRequiredMixin, ListView):
+class MailingSettingsListView(LoginRequiredMixin, OwnerFirstKeysetPaginationMixin, ListView):
     """
     CBV to display mailing settings.
     """
@@ -212,99 +240,29 @@ class MailingSettingsListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         """
-        Order such to display mailing settings of the current user at first, then others.
+        Mailing settings of the current user are shown at first, then others
+        (see OwnerFirstKeysetPaginationMixin).
         If user hasn't permission 'distribution.can_see_all_messages' filters queryset.
-        :returns: Ordered and filtered queryset
+        :returns: Filtered queryset
         """
         queryset = super().get_queryset()
 
-        queryset = queryset.order_by(
-            Case(
-                When(owner=self.request.user, then=1),
-                default=2,
-                output_field=IntegerField(),
-            )
-        )
-
         if self.request.user.has_perm('distribution.can_see_all_mailing_settings'):
             return queryset
         return queryset.filter(owner=self.request.user)
 
     def get_context_data(self, *args, **kwargs):
         """
-        Checks if the current user has permission 'distribution.can_see_all_mailing_settings'
-        and if true set context_data accordingly to see general users statistic, else - only current user statistic.
-        Also checks possibility for cache using instead sending requests to  database.
+        Sets dashboard statistics of the current user: general users statistic if the user has permission
+        'distribution.can_see_all_mailing_settings', else - only current user statistic.
+        Statistics are read from the per-user versioned cache, see get_dashboard. Expired mailings are
+        completed by the sweep_expired_mailings task, the page doesn't write to the database.
         :returns: context_data
         """
         context_data = super().get_context_data(*args, **kwargs)
-        now = timezone.localtime(timezone.now())
-        for data in context_data['object_list']:
-            if data.end_time < now:
-                data.status = MailingSettings.COMPLETED
-                data.save()
-
-        all_mailings = cache.get('all')
-        active = cache.get('active')
-        title = cache.get('title')
-        clients_count = cache.get('clients_count')
-        mailing_list = cache.get('mailing_list')
-
-        if self.request.user.has_perm('distribution.can_see_all_mailing_settings'):
-            if not all_mailings or not active or not title or not clients_count or not mailing_list:
-                all_mailings = context_data['all'] = context_data['object_list'].count()
-                active = context_data['active'] = context_data['object_list'].filter(
-                    status=MailingSettings.STARTED).count()
-                context_data['mailing_active'] = self.request.session.get('mailing_active', False)
-                title = context_data['title'] = 'Рассылки'
-
-                mailing_list = context_data['object_list'].prefetch_related('clients')
-                clients = set()
-                [[clients.add(client.email) for client in mailing.clients.all()] for mailing in mailing_list]
-                clients_count = context_data['clients_count'] = len(clients)
-
-                cache.set('all', all_mailings, 60 * 2)
-                cache.set('active', active, 60 * 2)
-                cache.set('title', title, 60 * 2)
-                cache.set('clients_count', clients_count, 60 * 2)
-                cache.set('mailing_list', mailing_list, 60 * 2)
-
-            else:
-                context_data['all'] = all_mailings
-                context_data['active'] = active
-                context_data['mailing_active'] = self.request.session.get('mailing_active', False)
-                context_data['title'] = title
-                clients = set()
-                [[clients.add(client.email) for client in mailing.clients.all()] for mailing in mailing_list]
-                context_data['clients_count'] = clients_count
-        else:
-            if not all_mailings or not active or not title or not clients_count or not mailing_list:
-                all_mailings = context_data['all'] = context_data['object_list'].filter(
-                    owner=self.request.user).count()
-                active = context_data['active'] = context_data['object_list'].filter(status=MailingSettings.STARTED,
-                                                                                     owner=self.request.user).count()
-                context_data['mailing_active'] = self.request.session.get('mailing_active', False)
-                title = context_data['title'] = 'Рассылки'
-
-                mailing_list = context_data['object_list'].filter(owner=self.request.user).prefetch_related('clients')
-                clients = set()
-                [[clients.add(client.email) for client in mailing.clients.all()] for mailing in mailing_list]
-                clients_count = context_data['clients_count'] = len(clients)
-
-                cache.set('all', all_mailings, 60 * 2)
-                cache.set('active', active, 60 * 2)
-                cache.set('title', title, 60 * 2)
-                cache.set('clients_count', clients_count, 60 * 2)
-                cache.set('mailing_list', mailing_list, 60 * 2)
-
-            else:
-                context_data['all'] = all_mailings
-                context_data['active'] = active
-                context_data['mailing_active'] = self.request.session.get('mailing_active', False)
-                context_data['title'] = title
-                clients = set()
-                [[clients.add(client.email) for client in mailing.clients.all()] for mailing in mailing_list]
-                context_data['clients_count'] = clients_count
+        context_data.update(get_dashboard(self.request.user))
+        context_data['mailing_active'] = self.request.session.get('mailing_active', False)
+        context_data['title'] = 'Рассылки'
         return context_data
 
     def post(self, request):
@@ -420,7 +378,7 @@ class MailingSettingsDeleteView(DeleteView):
 
 
 @method_decorator(cache_page(60 * 2), name='dispatch')
-class LogListView(LoginRequiredMixin, ListView):
+class LogListView(LoginRequiredMixin, TimeKeysetPaginationMixin, ListView):
     """
     CBV to display logs.
     """
@@ -445,7 +403,7 @@ class LogListView(LoginRequiredMixin, ListView):
     def get_context_data(self, *args, **kwargs):
         """
         Checks if current user has permission 'distribution.can_see_all_logs' and 'show_my_logs' state.
-        According to results set appropriate context_data
+        According to results set appropriate context_data. Counters are read from the daily rollup.
         :returns: context_data
         """
         context_data = super().get_context_data(*args, **kwargs)
@@ -453,16 +411,50 @@ class LogListView(LoginRequiredMixin, ListView):
 
         if self.request.user.has_perm('distribution.can_see_all_logs'):
             context_data['show_my_logs'] = show_my_logs
-            context_data['all'] = context_data['object_list'].count()
-            context_data['success'] = context_data['object_list'].count()
-            context_data['error'] = context_data['object_list'].filter(status=False).count()
+            context_data.update(get_delivery_totals(self.request.user if show_my_logs == "true" else None))
             if show_my_logs == "true":
                 context_data['title'] = 'Мои логи '
             else:
                 context_data['title'] = 'Логи'
         else:
-            context_data['all'] = context_data['object_list'].filter(owner=self.request.user).count()
-            context_data['success'] = context_data['object_list'].filter(status=True, owner=self.request.user).count()
-            context_data['error'] = context_data['object_list'].filter(status=False, owner=self.request.user).count()
+            context_data.update(get_delivery_totals(self.request.user))
             context_data['title'] = 'Логи'
         return context_data
+
+
+class ExportView(LoginRequiredMixin, View):
+    """
+    CBV to download logs or clients as CSV or JSONL. Rows are streamed from a server-side cursor,
+    so the size of the export doesn't affect memory of the web worker.
+    GET parameters: format (csv, jsonl), mailing, date_from and date_to (YYYY-MM-DD, logs only).
+    """
+    export_name = None
+
+    def get(self, request):
+        fmt = request.GET.get('format', 'csv')
+        if fmt not in CONTENT_TYPES:
+            return HttpResponseBadRequest(f"Unknown format {fmt}")
+        filters = {}
+        try:
+            if request.GET.get('mailing'):
+                filters['mailing_id'] = int(request.GET['mailing'])
+            for key in ('date_from', 'date_to'):
+                if request.GET.get(key):
+                    filters[key] = parse_date(request.GET[key])
+                    if filters[key] is None:
+                        raise ValueError(key)
+        except ValueError:
+            return HttpResponseBadRequest("Invalid filter")
+        queryset = get_export_queryset(self.export_name, request.user, **filters)
+        response = StreamingHttpResponse(iter_export(queryset, self.export_name, fmt),
+                                         content_type=f'{CONTENT_TYPES[fmt]}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{self.export_name}.{fmt}"'
+        return response
+
+
+class LogExportView(ExportView):
+    export_name = 'logs'
+
+
+class ClientExportView(ExportView):
+    export_name = 'clients'
@@ -4,6 +4,7 @@ import os
 
 hostname = socket.gethostname()
 worker_id = os.environ.get('CELERY_WORKER_ID', '1')  # Получаем ID из переменной среды, по умолчанию '1'
+queues = os.environ.get('CELERY_WORKER_QUEUES', 'mailing_queue')  # Очереди через запятую, по умолчанию 'mailing_queue'
 nodename = f"worker-{worker_id}@{hostname}"
 
 celery_command = [
@@ -17,7 +18,7 @@ celery_command = [
     "-n",
     nodename,
     "-Q",  # Добавление аргумента очереди
-    "mailing_queue",  # Очередь Celery по умолчанию
+    queues,
 ]
 
 subprocess.run(celery_command)
@@ -13,6 +13,12 @@ fi
 # Запускаем Celery worker
 python3 start_celery_worker.py &
 
+# Запускаем отдельный Celery worker для повторных отправок
+CELERY_WORKER_ID=retry CELERY_WORKER_QUEUES=retry_queue python3 start_celery_worker.py &
+
+# Запускаем отдельный Celery worker для писем регистрации и восстановления пароля
+CELERY_WORKER_ID=priority CELERY_WORKER_QUEUES=priority_queue python3 start_celery_worker.py &
+
 # Запускаем Celery beat
 celery -A celery_app.app beat -l info &
 
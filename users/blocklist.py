@@ -0,0 +1,106 @@
+import logging
+import time
+
+import redis
+from django.conf import settings
+
+from distribution.redis_client import get_redis
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+BLOCKED_USERS_KEY = 'users:blocked'
+# Set after the blocked set was filled from the database, a missing marker means Redis lost the data
+BLOCKED_USERS_LOADED_KEY = 'users:blocked:loaded'
+
+_blocked_user_ids = frozenset()
+_expires_at = 0.0
+
+
+def rebuild_blocked_users():
+    """
+    Fills the Redis set of blocked users from the database, the source of truth.
+    :returns: frozenset of blocked user ids
+    """
+    blocked_ids = frozenset(User.objects.filter(is_blocked=True).values_list('pk', flat=True))
+    pipeline = get_redis().pipeline()
+    pipeline.delete(BLOCKED_USERS_KEY)
+    if blocked_ids:
+        pipeline.sadd(BLOCKED_USERS_KEY, *blocked_ids)
+    pipeline.set(BLOCKED_USERS_LOADED_KEY, 1)
+    pipeline.execute()
+    return blocked_ids
+
+
+def load_blocked_user_ids():
+    """
+    Reads blocked user ids from Redis, rebuilds the set if it was lost.
+    Falls back to the database while Redis is unavailable.
+    :returns: frozenset of blocked user ids
+    """
+    try:
+        client = get_redis()
+        if not client.exists(BLOCKED_USERS_LOADED_KEY):
+            return rebuild_blocked_users()
+        return frozenset(int(pk) for pk in client.smembers(BLOCKED_USERS_KEY))
+    except redis.RedisError as e:
+        logger.warning(f"Blocked users set is unavailable ({e}), reading blocked users from the database")
+        return frozenset(User.objects.filter(is_blocked=True).values_list('pk', flat=True))
+
+
+def get_blocked_user_ids():
+    """
+    Returns blocked user ids from the in-process copy of the Redis set. The copy is refreshed
+    once per settings.BLOCKED_USERS_CACHE_TTL seconds, so a block made by any process takes effect
+    everywhere within that time and most requests cost no Redis or database round trip.
+    :returns: frozenset of blocked user ids
+    """
+    global _blocked_user_ids, _expires_at
+    now = time.monotonic()
+    if now >= _expires_at:
+        _blocked_user_ids = load_blocked_user_ids()
+        _expires_at = now + settings.BLOCKED_USERS_CACHE_TTL
+    return _blocked_user_ids
+
+
+def is_user_blocked(user_id):
+    """
+    :param user_id: user id
+    :returns: Boolean value
+    """
+    return user_id in get_blocked_user_ids()
+
+
+def sync_blocked_user(user_id, blocked):
+    """
+    Adds the user to the Redis set of blocked users or removes it from there.
+    The in-process copy is dropped, so the current process sees the change at once.
+    :param user_id: user id
+    :param blocked: new value of is_blocked
+    """
+    global _expires_at
+    try:
+        if blocked:
+            get_redis().sadd(BLOCKED_USERS_KEY, user_id)
+        else:
+            get_redis().srem(BLOCKED_USERS_KEY, user_id)
+    except redis.RedisError as e:
+        logger.error(f"Blocked users set was not updated for user with id: {user_id}: {e}")
+        try:
+            # the next reader rebuilds the set from the database
+            get_redis().delete(BLOCKED_USERS_LOADED_KEY)
+        except redis.RedisError:
+            pass
+    _expires_at = 0.0
+
+
+def set_user_blocked(user, blocked):
+    """
+    Blocks or unblocks the user. The Redis set is updated by post_save signal of the user,
+    sessions of the blocked user are ended by CheckBlockedMiddleware on their next request.
+    :param user: user instance
+    :param blocked: new value of is_blocked
+    """
+    user.is_blocked = blocked
+    user.save(update_fields=['is_blocked'])
+    logger.info(f"User with id: {user.pk} was {'blocked' if blocked else 'unblocked'}")
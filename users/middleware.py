@@ -1,23 +1,28 @@
 from django.contrib import messages
 from django.shortcuts import redirect
-from django.contrib.auth import logout
+from django.contrib.auth import logout, SESSION_KEY
 from django.urls import reverse
 
+from users.blocklist import is_user_blocked
+from users.models import User
+
 
 class CheckBlockedMiddleware:
     """
-    Constantly checks if user is not blocked. If true - logout him and show the message.
+    Constantly checks if user is not blocked. If true - logout the user and show the message.
+    User id is read from the session and checked against the cached set of blocked users,
+    so the check does not load the user from the database.
     """
 
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        if request.user.is_authenticated:
-            if request.user.is_blocked:
-                messages.info(request, "Вы были заблокированы в сервисе")
-                logout(request)
-                return redirect(reverse('users:login'))
+        user_id = request.session.get(SESSION_KEY)
+        if user_id is not None and is_user_blocked(User._meta.pk.to_python(user_id)):
+            messages.info(request, "Вы были заблокированы в сервисе")
+            logout(request)
+            return redirect(reverse('users:login'))
 
         response = self.get_response(request)
         return response
@@ -11,6 +11,7 @@ def send_greeting_email(username, user_email):
     Send greeting message to the new user.
     :param username: username
     :param user_email: user email
+    :raises: SMTPException to let the celery task retry
     """
     try:
         send_mail(
@@ -23,6 +24,7 @@ def send_greeting_email(username, user_email):
         )
     except SMTPException as e:
         logger.error(f"При отправке приветственного письма возникла ошибка: {e}")
+        raise
 
 
 def send_verification_email(verification_link, user_email):
@@ -30,6 +32,7 @@ def send_verification_email(verification_link, user_email):
     Send verification message to user after registration.
     :param verification_link: verification link
     :param user_email: user email
+    :raises: SMTPException to let the celery task retry
     """
     try:
         send_mail(
@@ -41,6 +44,7 @@ def send_verification_email(verification_link, user_email):
         )
     except SMTPException as e:
         logger.error(f"При отправке письма с ссылкой для подтверждения email возникла ошибка: {e}")
+        raise
 
 
 def create_verification_code():
@@ -56,6 +60,7 @@ def send_restore_password_email(restore_link, user_email):
     Send message to user with link for restore password.
     :param restore_link: restore link
     :param user_email: user email
+    :raises: SMTPException to let the celery task retry
     """
     try:
         send_mail(
@@ -67,3 +72,4 @@ def send_restore_password_email(restore_link, user_email):
         )
     except SMTPException as e:
         logger.error(f"При отправке письма с ссылкой для восстановления пароля возникла ошибка: {e}")
+        raise
@@ -1,8 +1,11 @@
 import logging
-from django.db.models.signals import m2m_changed
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import Group, User
 
+from users.blocklist import sync_blocked_user
+
 logger = logging.getLogger(__name__)
 
 
@@ -52,3 +55,16 @@ def user_groups_changed(sender, instance, action, reverse, model, pk_set, **kwar
                 if user.is_staff:
                     user.is_staff = False
                     user.save()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, update_fields, **kwargs):
+    """
+    Keeps the Redis set of blocked users in line with is_blocked field, including changes made in admin.
+    Saves which do not touch is_blocked, like last_login update on login, are skipped.
+    :param instance: saved user
+    :param update_fields: fields passed to save() or None
+    """
+    if update_fields is not None and 'is_blocked' not in update_fields:
+        return
+    sync_blocked_user(instance.pk, instance.is_blocked)
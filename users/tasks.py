@@ -0,0 +1,37 @@
+from smtplib import SMTPException
+
+from celery import shared_task
+
+from users.services import send_greeting_email, send_verification_email, send_restore_password_email
+
+# transient relay failures are retried with exponential backoff, so verification
+# and password reset emails are not lost
+EMAIL_RETRY_OPTIONS = {
+    'autoretry_for': (SMTPException, OSError),
+    'retry_backoff': True,
+    'retry_kwargs': {'max_retries': 5},
+}
+
+
+@shared_task(ignore_result=True, **EMAIL_RETRY_OPTIONS)
+def send_greeting_email_task(username, user_email):
+    """
+    Celery task of the priority queue. Sends greeting message to the new user.
+    """
+    send_greeting_email(username, user_email)
+
+
+@shared_task(ignore_result=True, **EMAIL_RETRY_OPTIONS)
+def send_verification_email_task(verification_link, user_email):
+    """
+    Celery task of the priority queue. Sends verification message to user after registration.
+    """
+    send_verification_email(verification_link, user_email)
+
+
+@shared_task(ignore_result=True, **EMAIL_RETRY_OPTIONS)
+def send_restore_password_email_task(restore_link, user_email):
+    """
+    Celery task of the priority queue. Sends message with link for restore password.
+    """
+    send_restore_password_email(restore_link, user_email)
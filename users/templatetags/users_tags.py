@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from django import template
 import pycountry
 
@@ -6,28 +8,34 @@ from users.models import User
 register = template.Library()
 
 
+@lru_cache(maxsize=None)
+def get_country_names():
+    """
+    Table of full country names by alpha-2 code, built once per process.
+    :returns: dict
+    """
+    return {country.alpha_2: country.name for country in pycountry.countries}
+
+
 @register.simple_tag
 def get_full_country_name(country_code):
     """
     get full country name
-    :returns: full country name or country_code in case of error
+    :returns: full country name or country_code if it is unknown
     """
-    try:
-        full_country_name = pycountry.countries.get(alpha_2=str(country_code)).name
-        return full_country_name
-    except Exception as e:
-        print(e)
-        return country_code
+    return get_country_names().get(str(country_code), country_code)
 
 
 @register.filter(name='check_is_manager')
-def check_is_manager(user_id):
+def check_is_manager(user):
     """
-    Check is user a manager
+    Check is user a manager. Uses is_manager annotation of the user list queryset if present,
+    otherwise queries groups once and memoizes the result on the user instance.
+    :param user: User instance or user id
     :returns: Boolean value
     """
-    user = User.objects.get(pk=user_id)
-    if user.groups.filter(name='Managers'):
-        return True
-    else:
-        return False
\ No newline at end of file
+    if not isinstance(user, User):
+        user = User.objects.get(pk=user)
+    if not hasattr(user, 'is_manager'):
+        user.is_manager = user.groups.filter(name='Managers').exists()
+    return user.is_manager
@@ -0,0 +1,74 @@
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.models import User
+from users.templatetags.users_tags import check_is_manager, get_full_country_name
+from users.views import UserListView
+
+
+class UserListQueriesTestCase(TestCase):
+    """
+    Query count of the user list page and of users template tags must not depend on the number of users.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.managers = Group.objects.create(name='Managers')
+        cls.viewer = User.objects.create(email='viewer@example.com', username='viewer', is_superuser=True)
+
+    def create_users(self, count, start=0):
+        """
+        Creates users with countries, every third one is blocked and every tenth one is a manager.
+        """
+        users = User.objects.bulk_create([
+            User(email=f'user{number}@example.com', username=f'user{number}',
+                 country='RU' if number % 2 else 'DE', is_blocked=not number % 3)
+            for number in range(start, start + count)
+        ])
+        Through = User.groups.through
+        Through.objects.bulk_create([Through(user_id=user.pk, group_id=self.managers.pk) for user in users[::10]])
+        return users
+
+    def render_user_list(self):
+        request = RequestFactory().get(reverse('users:user_list'))
+        request.user = self.viewer
+        response = UserListView.as_view()(request)
+        response.render()
+        return response
+
+    def test_user_list_query_count_does_not_grow_with_users(self):
+        self.create_users(10)
+        with CaptureQueriesContext(connection) as queries:
+            self.render_user_list()
+        self.create_users(200, start=10)
+        with self.assertNumQueries(len(queries)):
+            response = self.render_user_list()
+        self.assertEqual(len(response.context_data['object_list']), 211)
+
+    def test_user_list_counters(self):
+        self.create_users(20)
+        context = self.render_user_list().context_data
+        self.assertEqual(context['superusers'], 1)
+        self.assertEqual(context['managers'], 2)
+        self.assertEqual(context['usual_users'], 21)
+
+    def test_check_is_manager_uses_annotation(self):
+        self.create_users(20)
+        users = list(UserListView().get_queryset())
+        with self.assertNumQueries(0):
+            managers = [user.pk for user in users if check_is_manager(user)]
+        self.assertEqual(len(managers), 2)
+
+    def test_check_is_manager_queries_once_per_user(self):
+        manager = self.create_users(1)[0]
+        with self.assertNumQueries(1):
+            self.assertTrue(check_is_manager(manager))
+            self.assertTrue(check_is_manager(manager))
+
+    def test_get_full_country_name_makes_no_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(get_full_country_name('DE'), 'Germany')
+            self.assertEqual(get_full_country_name('XX'), 'XX')
@@ -1,5 +1,5 @@
 import logging
-from django.db.models import Case, When, IntegerField
+from django.db.models import Case, When, IntegerField, Count, Exists, OuterRef, Q
 
 from django.contrib import messages
 from django.contrib.auth.views import LogoutView
@@ -13,11 +13,12 @@ from django.views.decorators.cache import cache_page
 from django.views.generic import CreateView, UpdateView, FormView, TemplateView, ListView, DetailView
 
 from distribution.tasks import stop_distribution_task
+from users.blocklist import set_user_blocked
 from users.models import User
 from users.forms import UserRegisterForm, UserProfileForm, CustomAuthenticationForm, RestorePasswordForm, \
     SetNewPasswordForm
-from users.services import send_greeting_email, send_verification_email, create_verification_code, \
-    send_restore_password_email
+from users.services import create_verification_code
+from users.tasks import send_greeting_email_task, send_verification_email_task, send_restore_password_email_task
 
 logger = logging.getLogger(__name__)
 
@@ -63,8 +64,8 @@ class RegisterView(CreateView):
         new_user.is_active = False
         verification_url = f'http://192.168.0.102:8000/users/activate/{new_user.email_verification}'
         email = form.cleaned_data.get('email')
-        send_verification_email(verification_url, email)
         new_user.save()
+        send_verification_email_task.delay(verification_url, email)
 
         return super().form_valid(form)
 
@@ -95,7 +96,7 @@ def activate(request, uid):
         fake_verification = create_verification_code()
         user.email_verification = fake_verification
         user.save()
-        send_greeting_email(user.username, user.email)
+        send_greeting_email_task.delay(user.username, user.email)
         return redirect('users:email_activated')
     except Exception as e:
         logger.error(f"При попытке подтверждения почты произошла ошибка: {e}")
@@ -117,8 +118,8 @@ class EndRegistrationView(TemplateView):
                 if not user.is_active:
                     user.email_verification = create_verification_code()
                     verification_url = f'http://127.0.0.1:8000/users/activate/{user.email_verification}'
-                    send_verification_email(verification_url, email)
                     user.save()
+                    send_verification_email_task.delay(verification_url, email)
                     return redirect(reverse('users:login'))
                 else:
                     return redirect(reverse('users:email_activated'))
@@ -135,8 +136,8 @@ def restore_password(request):
                 user = User.objects.get(email=email)
                 user.restore_password_verification = create_verification_code()
                 restore_link = f'http://127.0.0.1:8000/users/restore_password/{user.restore_password_verification}'
-                send_restore_password_email(restore_link, email)
                 user.save()
+                send_restore_password_email_task.delay(restore_link, email)
                 messages.success(request, f"Письмо для восстановления пароля отправлено на почту {email}")
                 return redirect(reverse('users:login'))
             except ObjectDoesNotExist:
@@ -175,11 +176,19 @@ def set_new_password(request, uid):
             return render(request, 'users/incorrect_link.html')
 
 
+def get_managers_membership():
+    """
+    Subquery of Managers group membership of the outer user.
+    """
+    return User.groups.through.objects.filter(user_id=OuterRef('pk'), group__name='Managers')
+
+
 class UserListView(ListView):
     model = User
 
     def get_queryset(self):
-        return User.objects.all().order_by(
+        # is_manager is read by check_is_manager filter, so rows cost no extra queries
+        return User.objects.annotate(is_manager=Exists(get_managers_membership())).order_by(
             Case(
                 When(is_superuser=True, then=1),
                 When(is_staff=True, then=2),
@@ -191,24 +200,26 @@ class UserListView(ListView):
 
     def get_context_data(self, *args, **kwargs):
         context_data = super().get_context_data()
-        context_data['superusers'] = User.objects.filter(is_superuser=True).count()
-        context_data['usual_users'] = User.objects.all().count() - User.objects.filter(is_staff=True).count()
-        context_data['managers'] = User.objects.filter(groups__name='Managers').count()
+        counters = User.objects.aggregate(
+            total=Count('pk'),
+            staff=Count('pk', filter=Q(is_staff=True)),
+            superusers=Count('pk', filter=Q(is_superuser=True)),
+            managers=Count('pk', filter=Q(Exists(get_managers_membership()))),
+        )
+        context_data['superusers'] = counters['superusers']
+        context_data['usual_users'] = counters['total'] - counters['staff']
+        context_data['managers'] = counters['managers']
         return context_data
 
     def post(self, request):
         if request.method == 'POST':
             object_id = request.POST.get('block_user')
             if object_id:
-                user = User.objects.get(pk=object_id)
-                user.is_blocked = True
-                user.save()
+                set_user_blocked(User.objects.get(pk=object_id), True)
             else:
                 object_id = request.POST.get('unblock_user')
                 if object_id:
-                    user = User.objects.get(pk=object_id)
-                    user.is_blocked = False
-                    user.save()
+                    set_user_blocked(User.objects.get(pk=object_id), False)
             return redirect(reverse('users:user_list'))
 
 